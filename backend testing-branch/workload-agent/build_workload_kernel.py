@@ -0,0 +1,50 @@
+"""
+Ahead-of-time build of the workload analysis kernel
+---------------------------------------------------
+Compiles the per-process workload arithmetic into a native extension
+module (workload_kernel) next to this file, so the service starts without
+paying numba's JIT compile on the first request. workload_analyzer imports
+it when present and falls back to the JIT kernel otherwise.
+
+Run once per image build (needs numba and a C compiler):
+    python build_workload_kernel.py
+"""
+
+import os
+
+from numba.pycc import CC
+
+from workload_analyzer import _analyze_process
+
+cc = CC("workload_kernel")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+@cc.export(
+    "full_analysis_kernel",
+    "Tuple((f8, f8, f8, f8, f8, i8, f8, f8, f8))(f8[:], i8[:], f8, i8, f8, f8, f8)",
+)
+def full_analysis_kernel(
+    times,
+    units,
+    daily_volume,
+    current_workers,
+    prf,
+    allowance_factor,
+    total_hours,
+):
+    """Same contract as workload_analyzer._full_analysis_kernel"""
+    return _analyze_process(
+        times.sum(),
+        units.sum(),
+        daily_volume,
+        current_workers,
+        prf,
+        allowance_factor,
+        total_hours,
+    )
+
+
+if __name__ == "__main__":
+    cc.compile()
+    print(f"✅ Built workload_kernel in {cc.output_dir}")
@@ -4,12 +4,31 @@ SafexpressOps Workload Analysis Module
 Implements TIME AND MOTION STUDY calculations based on VFP-Productivity_TMS template
 """
 
-import pandas as pd
+import hashlib
+import math
+import struct
+import threading
+from collections import OrderedDict
+from operator import itemgetter
 import numpy as np
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Union
+from dataclasses import dataclass, field
 from datetime import datetime
 
+try:
+    # Thread count for parallel kernels follows NUMBA_NUM_THREADS
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is optional - kernels run as plain Python/NumPy
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 
 @dataclass
 class TimeStudyObservation:
@@ -25,8 +44,46 @@ class TimeStudyObservation:
 
 
 @dataclass
+class TimeStudyBatch:
+    """
+    Observations for one process stored as contiguous arrays
+
+    Keeps observed times and unit counts side by side (structure of arrays)
+    so the analysis math runs as NumPy reductions instead of per-object
+    attribute access.
+    """
+
+    times: np.ndarray  # float64 observed seconds per observation
+    units: np.ndarray  # int64 units per observation
+
+    @classmethod
+    def from_observations(cls, observations: List) -> "TimeStudyBatch":
+        """
+        Build a batch from observation records
+
+        Only observed_time_seconds and num_units are read, so validated API
+        rows work as well as TimeStudyObservation objects.
+        """
+        count = len(observations)
+        times = np.empty(count, dtype=np.float64)
+        units = np.empty(count, dtype=np.int64)
+        for idx, obs in enumerate(observations):
+            times[idx] = obs.observed_time_seconds
+            units[idx] = obs.num_units
+        return cls(times=times, units=units)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+@dataclass(frozen=True)
 class WorkloadParameters:
-    """Operational parameters for workload analysis"""
+    """
+    Operational parameters for workload analysis
+
+    Frozen so the derived constants below, computed once in __post_init__,
+    can never drift from the fields they come from.
+    """
 
     working_hours_per_shift: float = 8.0  # ← Renamed from hours_per_day
     days_per_month: float = 26.0
@@ -34,10 +91,341 @@ class WorkloadParameters:
     allowance_percentage: float = 0.15  # ← STANDARD is 15%, not 5%!
     num_shifts: int = 2  # ← Critical for multi-shift operations
 
-    @property
-    def total_hours_per_day(self) -> float:
-        """Total working hours across all shifts"""
-        return self.working_hours_per_shift * self.num_shifts
+    # Derived constants (not constructor arguments)
+    total_hours_per_day: float = field(init=False)  # across all shifts
+    allowance_factor: float = field(init=False)  # 1 + allowance
+    kernel_constants: Tuple[float, float, float] = field(init=False, repr=False)
+    cache_key_bytes: bytes = field(init=False, repr=False)
+
+    def __post_init__(self):
+        total_hours = float(self.working_hours_per_shift * self.num_shifts)
+        allowance_factor = float(1 + self.allowance_percentage)
+        kernel_constants = (
+            float(self.performance_rating_factor),
+            allowance_factor,
+            total_hours,
+        )
+
+        object.__setattr__(self, "total_hours_per_day", total_hours)
+        object.__setattr__(self, "allowance_factor", allowance_factor)
+        object.__setattr__(self, "kernel_constants", kernel_constants)
+        object.__setattr__(
+            self, "cache_key_bytes", struct.pack("<ddd", *kernel_constants)
+        )
+
+
+# fastmath=True would include "ninf"/"nnan", which let LLVM assume no
+# infinities - but the kernels return np.inf for an unstaffed process
+KERNEL_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+
+@njit(cache=True, fastmath=KERNEL_FASTMATH, nogil=True)
+def _analyze_process(
+    total_time,
+    total_units,
+    daily_volume,
+    current_workers,
+    prf,
+    allowance_factor,
+    total_hours,
+):
+    """
+    Per-process workload arithmetic shared by the scalar and batch kernels
+
+    Returns a fixed-size tuple in the order of the full_analysis result keys.
+    """
+    avg_observed = total_time / total_units if total_units != 0 else 0.0
+
+    normal_time = avg_observed * prf
+    standard_time = normal_time * allowance_factor
+    productivity_hour = 3600.0 / standard_time if standard_time > 0 else 0.0
+    productivity_day = productivity_hour * total_hours
+
+    if productivity_day <= 0:
+        required_workers = 0
+    else:
+        required_workers = math.ceil(daily_volume / productivity_day)
+
+    if productivity_hour <= 0 or current_workers <= 0:
+        utilization = 0.0
+        throughput = np.inf
+    else:
+        actual_workload = daily_volume / productivity_hour
+        utilization = actual_workload / (current_workers * total_hours) * 100.0
+        throughput = daily_volume / (current_workers * productivity_hour)
+
+    max_capacity = current_workers * total_hours * productivity_hour
+
+    return (
+        avg_observed,
+        normal_time,
+        standard_time,
+        productivity_hour,
+        productivity_day,
+        required_workers,
+        utilization,
+        max_capacity,
+        throughput,
+    )
+
+
+@njit(cache=True, fastmath=KERNEL_FASTMATH, nogil=True)
+def _full_analysis_kernel(
+    times,
+    units,
+    daily_volume,
+    current_workers,
+    prf,
+    allowance_factor,
+    total_hours,
+):
+    """
+    Fused arithmetic for WorkloadAnalyzer.full_analysis
+
+    Takes only arrays and scalars so numba can compile the whole pipeline
+    (observed -> standard time -> productivity -> staffing -> capacity)
+    into one native function.
+    """
+    return _analyze_process(
+        times.sum(),
+        units.sum(),
+        daily_volume,
+        current_workers,
+        prf,
+        allowance_factor,
+        total_hours,
+    )
+
+
+@njit(parallel=True, fastmath=KERNEL_FASTMATH, cache=True, nogil=True)
+def _batch_analysis_parallel(
+    sum_times,
+    sum_units,
+    daily_volumes,
+    current_workers,
+    prf,
+    allowance_factor,
+    total_hours,
+):
+    """
+    Batch kernel that fans processes out across cores with prange
+
+    Each process is independent, so iterations write straight into
+    preallocated output arrays with no shared state.
+    """
+    count = sum_times.shape[0]
+
+    avg_observed = np.empty(count, dtype=np.float64)
+    normal_time = np.empty(count, dtype=np.float64)
+    standard_time = np.empty(count, dtype=np.float64)
+    productivity_hour = np.empty(count, dtype=np.float64)
+    productivity_day = np.empty(count, dtype=np.float64)
+    required_workers = np.empty(count, dtype=np.int64)
+    utilization = np.empty(count, dtype=np.float64)
+    max_capacity = np.empty(count, dtype=np.float64)
+    throughput = np.empty(count, dtype=np.float64)
+
+    for idx in prange(count):
+        (
+            avg_observed[idx],
+            normal_time[idx],
+            standard_time[idx],
+            productivity_hour[idx],
+            productivity_day[idx],
+            required_workers[idx],
+            utilization[idx],
+            max_capacity[idx],
+            throughput[idx],
+        ) = _analyze_process(
+            sum_times[idx],
+            sum_units[idx],
+            daily_volumes[idx],
+            current_workers[idx],
+            prf,
+            allowance_factor,
+            total_hours,
+        )
+
+    return (
+        avg_observed,
+        normal_time,
+        standard_time,
+        productivity_hour,
+        productivity_day,
+        required_workers,
+        utilization,
+        max_capacity,
+        throughput,
+    )
+
+
+def _batch_analysis_arrays(
+    sum_times,
+    sum_units,
+    daily_volumes,
+    current_workers,
+    prf,
+    allowance_factor,
+    total_hours,
+):
+    """
+    Whole-array version of _full_analysis_kernel for many processes at once
+
+    Each input is a 1-D array with one entry per process; divide-by-zero
+    guards use np.where so the same rules as the scalar kernel apply.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_observed = np.where(sum_units != 0, sum_times / sum_units, 0.0)
+
+        normal_time = avg_observed * prf
+        standard_time = normal_time * allowance_factor
+        productivity_hour = np.where(standard_time > 0, 3600.0 / standard_time, 0.0)
+        productivity_day = productivity_hour * total_hours
+
+        required_workers = np.where(
+            productivity_day > 0, np.ceil(daily_volumes / productivity_day), 0
+        ).astype(np.int64)
+
+        staffed = (productivity_hour > 0) & (current_workers > 0)
+        utilization = np.where(
+            staffed,
+            daily_volumes / productivity_hour / (current_workers * total_hours) * 100.0,
+            0.0,
+        )
+        throughput = np.where(
+            staffed, daily_volumes / (current_workers * productivity_hour), np.inf
+        )
+
+        max_capacity = current_workers * total_hours * productivity_hour
+
+    return (
+        avg_observed,
+        normal_time,
+        standard_time,
+        productivity_hour,
+        productivity_day,
+        required_workers,
+        utilization,
+        max_capacity,
+        throughput,
+    )
+
+
+# Below this many processes the prange launch costs more than it saves
+PARALLEL_BATCH_MIN_PROCESSES = 256
+
+# Numba's workqueue threading layer (the fallback when TBB/OpenMP are not
+# installed) aborts the whole process if a parallel kernel is entered from
+# two threads at once, and batch_analysis runs in request worker threads
+_parallel_kernel_lock = threading.Lock()
+
+
+def _batch_analysis_dispatch(
+    sum_times,
+    sum_units,
+    daily_volumes,
+    current_workers,
+    prf,
+    allowance_factor,
+    total_hours,
+):
+    """
+    Route a batch to the whole-array NumPy path or the parallel numba kernel
+
+    Typical workbooks hold a handful of processes, which stay on the NumPy
+    path; only large batches fan out, one at a time.
+    """
+    args = (
+        sum_times,
+        sum_units,
+        daily_volumes,
+        current_workers,
+        prf,
+        allowance_factor,
+        total_hours,
+    )
+    if sum_times.shape[0] < PARALLEL_BATCH_MIN_PROCESSES:
+        return _batch_analysis_arrays(*args)
+    with _parallel_kernel_lock:
+        return _batch_analysis_parallel(*args)
+
+
+try:
+    # Ahead-of-time build from build_workload_kernel.py; needs no JIT at all
+    from workload_kernel import full_analysis_kernel as _full_analysis_kernel
+
+    AOT_KERNEL_AVAILABLE = True
+except ImportError:
+    AOT_KERNEL_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    # Compile (or load from cache) at import instead of on the first request
+    if not AOT_KERNEL_AVAILABLE:
+        _full_analysis_kernel(
+            np.ones(1, dtype=np.float64),
+            np.ones(1, dtype=np.int64),
+            1.0,
+            1,
+            1.0,
+            1.0,
+            1.0,
+        )
+    # parallel=True kernels cannot be built ahead of time
+    _batch_analysis_parallel(
+        np.ones(1, dtype=np.float64),
+        np.ones(1, dtype=np.int64),
+        np.ones(1, dtype=np.float64),
+        np.ones(1, dtype=np.int64),
+        1.0,
+        1.0,
+        1.0,
+    )
+    _batch_kernel = _batch_analysis_dispatch
+else:
+    # Without numba a prange loop would be interpreted; whole-array NumPy wins
+    _batch_kernel = _batch_analysis_arrays
+
+
+class AnalysisCache:
+    """
+    Thread-safe LRU cache of kernel outputs keyed by an input digest
+
+    Re-uploading the same workbook yields identical per-process inputs, so
+    the computed values can be reused instead of re-running the pipeline.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, Tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Optional[bytes]) -> Optional[Tuple]:
+        if key is None:
+            return None
+        with self._lock:
+            values = self._entries.get(key)
+            if values is not None:
+                self._entries.move_to_end(key)
+            return values
+
+    def put(self, key: Optional[bytes], values: Tuple) -> None:
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = values
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Studies shorter than this are cheaper to recompute than to hash and store
+CACHE_MIN_OBSERVATIONS = 3
+
+analysis_cache = AnalysisCache()
 
 
 class WorkloadAnalyzer:
@@ -55,20 +443,29 @@ class WorkloadAnalyzer:
     def __init__(self, params: WorkloadParameters = None):
         self.params = params or WorkloadParameters()
 
+    def _total_hours(self, hours_per_day: Optional[float] = None) -> float:
+        """Working hours per day across all shifts (precomputed unless overridden)"""
+        if hours_per_day:
+            return hours_per_day * self.params.num_shifts
+        return self.params.total_hours_per_day
+
     def calculate_average_observed_time(
-        self, observations: List[TimeStudyObservation]
+        self, observations: Union[List[TimeStudyObservation], TimeStudyBatch]
     ) -> float:
         """
         Calculate average observed time per unit from multiple observations
 
         Args:
-            observations: List of time study observations
+            observations: List of time study observations or a TimeStudyBatch
 
         Returns:
             Average time in seconds per unit
         """
-        total_time = sum(obs.observed_time_seconds for obs in observations)
-        total_units = sum(obs.num_units for obs in observations)
+        if not isinstance(observations, TimeStudyBatch):
+            observations = TimeStudyBatch.from_observations(observations)
+
+        total_time = float(observations.times.sum())
+        total_units = int(observations.units.sum())
 
         if total_units == 0:
             return 0.0
@@ -108,7 +505,8 @@ class WorkloadAnalyzer:
         Returns:
             Standard time in seconds
         """
-        allowance = allowance or self.params.allowance_percentage
+        if not allowance:
+            return normal_time_seconds * self.params.allowance_factor
         return normal_time_seconds * (1 + allowance)
 
     def calculate_productivity_per_hour(self, standard_time_seconds: float) -> float:
@@ -139,11 +537,8 @@ class WorkloadAnalyzer:
         NOTE: In multi-shift operations, hours_per_day should reflect TOTAL working hours.
         Example: 2 shifts × 8 hours = 16 hours per day
         """
-        hours = hours_per_day or self.params.working_hours_per_shift
-        num_shifts = self.params.num_shifts  # ← Use this!
-
         # Calculate total working hours per day
-        total_hours = hours * num_shifts
+        total_hours = self._total_hours(hours_per_day)
 
         return productivity_per_hour * total_hours
 
@@ -161,11 +556,8 @@ class WorkloadAnalyzer:
         IMPORTANT: This returns workers needed PER SHIFT, not total workforce.
         Total headcount = Required Workers × Number of Shifts
         """
-        hours = hours_per_day or self.params.working_hours_per_shift
-        num_shifts = self.params.num_shifts
-
         # Total production hours available per day
-        total_hours = hours * num_shifts
+        total_hours = self._total_hours(hours_per_day)
 
         # Capacity per worker per day (across all shifts)
         daily_capacity_per_worker = productivity_per_hour * total_hours
@@ -174,7 +566,7 @@ class WorkloadAnalyzer:
             return 0
 
         required = daily_volume / daily_capacity_per_worker
-        return int(np.ceil(required))
+        return math.ceil(required)
 
     def calculate_utilization(
         self,
@@ -191,14 +583,11 @@ class WorkloadAnalyzer:
         Args:
             num_workers: Number of workers PER SHIFT
         """
-        hours = hours_per_day or self.params.working_hours_per_shift
-        num_shifts = self.params.num_shifts
-
         if productivity_per_hour <= 0 or num_workers <= 0:
             return 0.0
 
         # Total available capacity (all workers, all shifts)
-        total_hours = hours * num_shifts
+        total_hours = self._total_hours(hours_per_day)
         available_capacity = num_workers * total_hours  # man-hours
 
         # Actual workload needed
@@ -220,10 +609,7 @@ class WorkloadAnalyzer:
         Args:
             num_workers: Number of workers PER SHIFT
         """
-        hours = hours_per_day or self.params.working_hours_per_shift
-        num_shifts = self.params.num_shifts
-
-        total_hours = hours * num_shifts
+        total_hours = self._total_hours(hours_per_day)
         return num_workers * total_hours * productivity_per_hour
 
     def calculate_throughput_time(
@@ -249,7 +635,7 @@ class WorkloadAnalyzer:
 
     def full_analysis(
         self,
-        observations: List[TimeStudyObservation],
+        observations: Union[List[TimeStudyObservation], TimeStudyBatch],
         daily_volume: float,
         current_workers: int,
     ) -> Dict:
@@ -257,42 +643,126 @@ class WorkloadAnalyzer:
         Perform complete workload analysis
 
         Args:
-            observations: Time study observations
+            observations: Time study observations (list or TimeStudyBatch)
             daily_volume: Expected daily volume
             current_workers: Current number of workers
 
         Returns:
             Dictionary with all analysis results
         """
-        # Step 1: Calculate average observed time
-        avg_observed = self.calculate_average_observed_time(observations)
-
-        # Step 2: Calculate normal time
-        normal_time = self.calculate_normal_time(avg_observed)
+        if not isinstance(observations, TimeStudyBatch):
+            observations = TimeStudyBatch.from_observations(observations)
+
+        key = self._cache_key(observations, daily_volume, current_workers)
+        values = analysis_cache.get(key)
+
+        if values is None:
+            # Steps 1-7 run in a single fused kernel (see _full_analysis_kernel)
+            values = tuple(
+                float(value)
+                for value in _full_analysis_kernel(
+                    observations.times,
+                    observations.units,
+                    float(daily_volume),
+                    int(current_workers),
+                    *self.params.kernel_constants,
+                )
+            )
+            analysis_cache.put(key, values)
 
-        # Step 3: Calculate standard time
-        standard_time = self.calculate_standard_time(normal_time)
+        return self._build_result(values, current_workers)
 
-        # Step 4: Calculate productivity
-        productivity_hour = self.calculate_productivity_per_hour(standard_time)
-        productivity_day = self.calculate_productivity_per_day(productivity_hour)
+    def batch_analysis(
+        self,
+        batches: List[TimeStudyBatch],
+        daily_volumes: List[float],
+        current_workers: List[int],
+    ) -> List[Dict]:
+        """
+        Perform full_analysis for many processes in one vectorized pass
 
-        # Step 5: Calculate manpower requirements
-        required_workers = self.calculate_required_manpower(
-            daily_volume, productivity_hour
-        )
+        Args:
+            batches: One TimeStudyBatch per process
+            daily_volumes: Expected daily volume per process
+            current_workers: Current number of workers per process
 
-        # Step 6: Calculate utilization
-        utilization = self.calculate_utilization(
-            daily_volume, current_workers, productivity_hour
-        )
+        Returns:
+            List of full_analysis result dictionaries, in input order
+        """
+        keys = [
+            self._cache_key(batch, volume, workers)
+            for batch, volume, workers in zip(batches, daily_volumes, current_workers)
+        ]
+        rows = [analysis_cache.get(key) for key in keys]
+        misses = [idx for idx, row in enumerate(rows) if row is None]
+
+        if misses:
+            count = len(misses)
+            sum_times = np.fromiter(
+                (batches[idx].times.sum() for idx in misses),
+                dtype=np.float64,
+                count=count,
+            )
+            sum_units = np.fromiter(
+                (batches[idx].units.sum() for idx in misses),
+                dtype=np.int64,
+                count=count,
+            )
+            volumes = np.fromiter(
+                (daily_volumes[idx] for idx in misses), dtype=np.float64, count=count
+            )
+            workers = np.fromiter(
+                (current_workers[idx] for idx in misses), dtype=np.int64, count=count
+            )
 
-        # Step 7: Calculate capacities
-        max_capacity = self.calculate_max_capacity(current_workers, productivity_hour)
+            columns = _batch_kernel(
+                sum_times,
+                sum_units,
+                volumes,
+                workers,
+                *self.params.kernel_constants,
+            )
 
-        throughput = self.calculate_throughput_time(
-            daily_volume, current_workers, productivity_hour
-        )
+            for idx, values in zip(
+                misses, zip(*(column.tolist() for column in columns))
+            ):
+                values = tuple(float(value) for value in values)
+                rows[idx] = values
+                analysis_cache.put(keys[idx], values)
+
+        return [
+            self._build_result(values, int(workers))
+            for values, workers in zip(rows, current_workers)
+        ]
+
+    def _cache_key(
+        self, batch: TimeStudyBatch, daily_volume: float, current_workers: int
+    ) -> Optional[bytes]:
+        """Digest of everything the analysis depends on (None = don't cache)"""
+        if len(batch) < CACHE_MIN_OBSERVATIONS:
+            return None
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(batch.times, dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(batch.units, dtype=np.int64).tobytes())
+        digest.update(self.params.cache_key_bytes)
+        digest.update(struct.pack("<dq", float(daily_volume), int(current_workers)))
+        return digest.digest()
+
+    def _build_result(self, values: Tuple, current_workers: int) -> Dict:
+        """Pack kernel output values into the full_analysis result dictionary"""
+        (
+            avg_observed,
+            normal_time,
+            standard_time,
+            productivity_hour,
+            productivity_day,
+            required_workers,
+            utilization,
+            max_capacity,
+            throughput,
+        ) = values
+        required_workers = int(required_workers)
 
         return {
             "observed_time_seconds": avg_observed,
@@ -384,6 +854,48 @@ class ProcessComparator:
 
         return min_capacity if min_capacity != float("inf") else 0.0
 
+    def summarize(
+        self, processes: Dict[str, Dict]
+    ) -> Tuple[Optional[str], float, float, List[Tuple[str, float, float]]]:
+        """
+        Bottleneck, system capacity and throughput ranking in a single pass
+
+        Same results as identify_bottleneck + calculate_system_capacity plus a
+        sort by throughput, without walking the results three times.
+
+        Args:
+            processes: Dict mapping process name to analysis results
+
+        Returns:
+            Tuple of (bottleneck_name, bottleneck_time, system_capacity,
+            ranking) where ranking is a list of
+            (process_name, throughput_hours, utilization_percent) sorted by
+            throughput, longest first
+        """
+        bottleneck = None
+        max_throughput = 0.0
+        min_capacity = float("inf")
+        ranking = []
+
+        for process_name, analysis in processes.items():
+            throughput = analysis.get("throughput_hours", 0)
+            capacity = analysis.get("max_daily_capacity", float("inf"))
+
+            if throughput > max_throughput:
+                max_throughput = throughput
+                bottleneck = process_name
+            if capacity < min_capacity:
+                min_capacity = capacity
+
+            ranking.append(
+                (process_name, throughput, analysis.get("utilization_percent", 0))
+            )
+
+        ranking.sort(key=itemgetter(1), reverse=True)
+        system_capacity = min_capacity if min_capacity != float("inf") else 0.0
+
+        return bottleneck, max_throughput, system_capacity, ranking
+
 
 # Example usage and testing
 if __name__ == "__main__":
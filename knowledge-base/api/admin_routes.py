@@ -84,10 +84,10 @@ async def get_weaviate_documents(
     - filename, upload_date, uploaded_by, version, total_chunks
     """
     try:
-        from database.document_db import DocumentDatabase
+        from database.document_db import get_document_db
         
         # Get documents from SQLite (authoritative source)
-        doc_db = DocumentDatabase()
+        doc_db = get_document_db()
         sql_documents = doc_db.list_documents(limit=limit, order_by="upload_date", order_dir="DESC")
         
         # Build response from SQLite data
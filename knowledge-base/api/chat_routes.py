@@ -1,19 +1,73 @@
 # api/chat_routes.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional, Dict, Any, List
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.requests import HTTPConnection
+from pydantic import BaseModel, Field, StringConstraints, ValidationError
+from typing import Annotated, Optional, Dict, Any, Iterator, List, Tuple, Type
 from services.chat_service import ChatService
 from middleware.jwt_middleware import get_current_user
 from middleware.security_middleware import (
-    validate_string_length,
     MAX_MESSAGE_LENGTH,
     MAX_SESSION_TITLE_LENGTH
 )
 from utils.llm_error_handler import LLMServiceException
 
+logger = logging.getLogger(__name__)
+
 chat_router = APIRouter(prefix='/chat', tags=['chat'])
-chat_service = ChatService()
+
+
+async def get_chat_service(connection: HTTPConnection) -> ChatService:
+    """Dependency returning the app-wide ChatService created in the app lifespan"""
+    return connection.app.state.chat_service
+
+
+class SessionListCache:
+    """
+    Short-lived per-user cache of serialized GET /sessions pages and their ETags.
+    The sidebar polls this listing; it only changes when one of the user's
+    sessions is created, updated or deleted, which invalidates the user's pages.
+    """
+    
+    def __init__(self, ttl_seconds: int = 5, max_users: int = 5000):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self.entries: "OrderedDict[str, Dict[Tuple[int, int], Tuple[bytes, str, float]]]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, user_id: str, page: Tuple[int, int]) -> Optional[Tuple[bytes, str]]:
+        with self.lock:
+            entry = self.entries.get(user_id, {}).get(page)
+            if entry is None:
+                return None
+            body, etag, expires_at = entry
+            if time.time() >= expires_at:
+                del self.entries[user_id][page]
+                return None
+            return body, etag
+    
+    def put(self, user_id: str, page: Tuple[int, int], body: bytes, etag: str):
+        with self.lock:
+            pages = self.entries.setdefault(user_id, {})
+            pages[page] = (body, etag, time.time() + self.ttl_seconds)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_users:
+                self.entries.popitem(last=False)
+    
+    def invalidate(self, user_id: Optional[str]):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+
+# Global session listing cache instance
+session_list_cache = SessionListCache()
 
 
 def extract_user_id(current_user: dict) -> Optional[str]:
@@ -26,374 +80,348 @@ def extract_user_id(current_user: dict) -> Optional[str]:
     user_id = current_user.get("uuid") or current_user.get("user_id") or current_user.get("sub")
     return str(user_id) if user_id is not None else None
 
+async def get_chat_user_id(current_user: dict = Depends(get_current_user)) -> Optional[str]:
+    """
+    Dependency that resolves the caller's user_id once per request.
+    Same claim precedence as extract_user_id.
+    """
+    return extract_user_id(current_user)
+
+# Request text is stripped and length-checked inside pydantic-core,
+# so validating these models never calls back into Python
+Message = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=MAX_MESSAGE_LENGTH)]
+SessionTitle = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=MAX_SESSION_TITLE_LENGTH)]
+
 # Request models with validation
 class CreateSessionRequest(BaseModel):
-    title: Optional[str] = Field(None, max_length=MAX_SESSION_TITLE_LENGTH)
-    initial_message: Optional[str] = Field(None, max_length=MAX_MESSAGE_LENGTH)
+    # Blank title / initial_message are allowed and treated as not given
+    title: Optional[Annotated[str, StringConstraints(strip_whitespace=True, max_length=MAX_SESSION_TITLE_LENGTH)]] = None
+    initial_message: Optional[Annotated[str, StringConstraints(strip_whitespace=True, max_length=MAX_MESSAGE_LENGTH)]] = None
     options: Optional[Dict[str, Any]] = Field(default_factory=dict)
-    
-    @field_validator('title')
-    @classmethod
-    def validate_title(cls, v):
-        if v is not None and v.strip():
-            return validate_string_length(v.strip(), MAX_SESSION_TITLE_LENGTH, "title")
-        return v
-    
-    @field_validator('initial_message')
-    @classmethod
-    def validate_message(cls, v):
-        if v is not None and v.strip():
-            return validate_string_length(v.strip(), MAX_MESSAGE_LENGTH, "message")
-        return v
 
 class SendMessageRequest(BaseModel):
-    session_id: str = Field(..., min_length=1, max_length=100)
-    message: str = Field(..., min_length=1, max_length=MAX_MESSAGE_LENGTH)
+    session_id: Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=100)]
+    message: Message
     options: Optional[Dict[str, Any]] = Field(default_factory=dict)
-    
-    @field_validator('message')
-    @classmethod
-    def validate_message(cls, v):
-        if not v or not v.strip():
-            raise ValueError("Message cannot be empty")
-        return validate_string_length(v.strip(), MAX_MESSAGE_LENGTH, "message")
-    
-    @field_validator('session_id')
-    @classmethod
-    def validate_session_id(cls, v):
-        if not v or not v.strip():
-            raise ValueError("Session ID cannot be empty")
-        return v.strip()
 
 class UpdateSessionTitleRequest(BaseModel):
-    title: str = Field(..., min_length=1, max_length=MAX_SESSION_TITLE_LENGTH)
-    
-    @field_validator('title')
-    @classmethod
-    def validate_title(cls, v):
-        if not v or not v.strip():
-            raise ValueError("Title cannot be empty")
-        return validate_string_length(v.strip(), MAX_SESSION_TITLE_LENGTH, "title")
-
-@chat_router.post('/session/new')
-async def create_session(
-    request: CreateSessionRequest,
-    current_user: dict = Depends(get_current_user)
+    title: SessionTitle
+
+def json_body(model: Type[BaseModel]):
+    """
+    Dependency that validates the raw JSON request body against `model`.
+    model_validate_json parses and validates in a single pydantic-core pass,
+    skipping the intermediate json.loads dict FastAPI would otherwise build.
+    Validation failures still surface as the usual 422 response.
+    """
+    async def parse_body(request: Request) -> BaseModel:
+        body = await request.body()
+        try:
+            return model.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [
+                    {**error, 'loc': ('body', *error['loc'])}
+                    for error in e.errors(include_url=False)
+                ],
+                body=body
+            )
+    
+    return parse_body
+
+
+def json_body_openapi(model: Type[BaseModel]) -> Dict[str, Any]:
+    """OpenAPI requestBody for routes that validate through json_body"""
+    return {
+        'requestBody': {
+            'required': True,
+            'content': {'application/json': {'schema': model.model_json_schema()}}
+        }
+    }
+
+
+@chat_router.post('/session/new', openapi_extra=json_body_openapi(CreateSessionRequest))
+def create_session(
+    request: CreateSessionRequest = Depends(json_body(CreateSessionRequest)),
+    user_id: Optional[str] = Depends(get_chat_user_id),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
     """Create a new chat session"""
-    try:
-        user_id = extract_user_id(current_user)
-        print(f"[ChatRoutes] Creating session for user_id: {user_id}")
-        
-        # Check if user is active before creating session
-        import os
-        from utils.quota_client import QuotaClientSync, UserDeactivatedException
-        quota_enabled = os.getenv("QUOTA_ENABLED", "true").lower() == "true"
-        if quota_enabled and user_id:
-            try:
-                quota_client = QuotaClientSync()
-                print(f"[ChatRoutes] Checking quota for user_id: {user_id}")
-                quota_client.check(
-                    user_id=user_id,
-                    estimated_tokens=0,
-                    service="knowledge-base",
-                    operation="create_session",
-                    raise_on_exceed=False
-                )
-                print(f"[ChatRoutes] ✅ User {user_id} is active")
-            except UserDeactivatedException as e:
-                print(f"[ChatRoutes] ❌ User {user_id} is DEACTIVATED")
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"Access denied: {e.message}"
-                )
-            except Exception as e:
-                print(f"[ChatRoutes] ⚠️ Quota check error: {e} - allowing operation")
-                pass  # Allow if quota service is unavailable
-        
-        # Create session
-        session = chat_service.create_session(user_id, request.title)
-        
-        # Process initial message if provided
-        if request.initial_message:
-            chat_service.process_message(
-                session_id=session['session_id'],
-                user_message=request.initial_message,
-                options=request.options or {},
-                user_id=user_id
+    print(f"[ChatRoutes] Creating session for user_id: {user_id}")
+    
+    # Check if user is active before creating session
+    import os
+    from utils.quota_client import QuotaClientSync, UserDeactivatedException
+    quota_enabled = os.getenv("QUOTA_ENABLED", "true").lower() == "true"
+    if quota_enabled and user_id:
+        try:
+            quota_client = QuotaClientSync()
+            print(f"[ChatRoutes] Checking quota for user_id: {user_id}")
+            quota_client.check(
+                user_id=user_id,
+                estimated_tokens=0,
+                service="knowledge-base",
+                operation="create_session",
+                raise_on_exceed=False
             )
-        
-        return {
-            'success': True,
-            'session_id': session['session_id'],
-            'created_at': session['created_at'],
-            'message': 'Session created successfully'
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        error_msg = str(e)
-        print(f"Error creating session: {e}")
-        import traceback
-        traceback.print_exc()
-        
-        # Check if this is an access denied error (deactivated user)
-        if "Access denied" in error_msg or "deactivated" in error_msg.lower():
+            print(f"[ChatRoutes] ✅ User {user_id} is active")
+        except UserDeactivatedException as e:
+            print(f"[ChatRoutes] ❌ User {user_id} is DEACTIVATED")
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=error_msg
+                detail=f"Access denied: {e.message}"
             )
-        
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=error_msg
+        except Exception as e:
+            print(f"[ChatRoutes] ⚠️ Quota check error: {e} - allowing operation")
+            pass  # Allow if quota service is unavailable
+    
+    # Create session (and answer the initial message if provided)
+    if request.initial_message:
+        session = chat_service.create_session_with_initial_message(
+            user_id=user_id,
+            title=request.title,
+            message=request.initial_message,
+            options=request.options or {}
         )
+    else:
+        session = chat_service.create_session(user_id, request.title)
+    session_list_cache.invalidate(user_id)
+    
+    return ORJSONResponse({
+        'success': True,
+        'session_id': session['session_id'],
+        'created_at': session['created_at'],
+        'message': 'Session created successfully'
+    })
 
 
-@chat_router.post('/message')
-async def send_message(
-    request: SendMessageRequest,
-    current_user: dict = Depends(get_current_user)
-):
-    """Send a message in a chat session"""
+def sse_events(events: Iterator[Dict], user_id: Optional[str]) -> Iterator[bytes]:
+    """Format ChatService.stream_message events as server-sent events"""
     try:
-        user_id = extract_user_id(current_user)
-        
-        if not request.session_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail='session_id is required'
-            )
-        
-        if not request.message:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail='message is required'
-            )
-        
-        # Process message
-        response = chat_service.process_message(
+        for event in events:
+            yield b'data: ' + orjson.dumps(event) + b'\n\n'
+    except LLMServiceException as llm_ex:
+        print(f"🔴 LLM Error in chat stream: {llm_ex}")
+        yield b'data: ' + orjson.dumps({'type': 'error', **llm_ex.to_dict()}) + b'\n\n'
+    except Exception as e:
+        logger.exception("Error streaming message")
+        yield b'data: ' + orjson.dumps({'type': 'error', 'content': str(e)}) + b'\n\n'
+    finally:
+        # Title, message count and updated_at may have changed
+        session_list_cache.invalidate(user_id)
+
+
+@chat_router.post('/message', openapi_extra=json_body_openapi(SendMessageRequest))
+def send_message(
+    http_request: Request,
+    request: SendMessageRequest = Depends(json_body(SendMessageRequest)),
+    user_id: Optional[str] = Depends(get_chat_user_id),
+    chat_service: ChatService = Depends(get_chat_service)
+):
+    """
+    Send a message in a chat session.
+    Clients that send `Accept: text/event-stream` receive the reply as
+    server-sent events while it is generated instead of one JSON body.
+    """
+    if not request.session_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='session_id is required'
+        )
+    
+    if not request.message:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='message is required'
+        )
+    
+    if 'text/event-stream' in http_request.headers.get('accept', ''):
+        # Ownership errors raise here, before the stream starts
+        events = chat_service.stream_message(
             session_id=request.session_id,
             user_message=request.message,
             options=request.options or {},
             user_id=user_id
         )
-        
-        return {
-            'success': True,
-            **response
-        }
-        
-    except HTTPException:
-        raise
-    except LLMServiceException as llm_ex:
-        # Return LLM error with structured response for frontend popup
-        print(f"🔴 LLM Error in chat: {llm_ex}")
-        return JSONResponse(
-            status_code=llm_ex.status_code,
-            content={
-                'success': False,
-                **llm_ex.to_dict()
-            }
+        return StreamingResponse(
+            sse_events(events, user_id),
+            media_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache'}
         )
-    except Exception as e:
-        error_msg = str(e)
-        print(f"Error processing message: {e}")
-        import traceback
-        traceback.print_exc()
-        
-        # Check if this is an access denied error (deactivated user)
-        if "Access denied" in error_msg or "deactivated" in error_msg.lower():
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=error_msg
-            )
-        
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=error_msg
+    
+    # Process message
+    try:
+        response = chat_service.process_message(
+            session_id=request.session_id,
+            user_message=request.message,
+            options=request.options or {},
+            user_id=user_id
         )
+    finally:
+        # Title, message count and updated_at may have changed
+        session_list_cache.invalidate(user_id)
+    
+    return ORJSONResponse({
+        'success': True,
+        **response
+    })
 
 
 @chat_router.get('/session/{session_id}/history')
-async def get_session_history(
+def get_session_history(
+    request: Request,
     session_id: str,
     limit: Optional[int] = None,
-    current_user: dict = Depends(get_current_user)
+    user_id: Optional[str] = Depends(get_chat_user_id),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
-    """Get session history with messages"""
-    try:
-        user_id = extract_user_id(current_user)
-        
-        result = chat_service.get_session_history(session_id, limit, user_id)
-        
-        if not result:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail='Session not found or access denied'
-            )
-        
-        return {
-            'success': True,
-            'session_id': session_id,
-            'session': result['session'],
-            'messages': result['messages'],
-            'total_messages': len(result['messages'])
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error getting session history: {e}")
-        import traceback
-        traceback.print_exc()
+    """Get session history with messages (ETag-aware)"""
+    version = chat_service.get_history_version(session_id, user_id)
+    
+    if not version:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Session not found or access denied'
+        )
+    
+    # Any new message, title or metadata change bumps the session's updated_at
+    updated_at, message_count = version
+    digest = hashlib.blake2b(f'{updated_at}:{limit}'.encode(), digest_size=8).hexdigest()
+    etag = f'W/"{message_count}-{digest}"'
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    result = chat_service.get_session_history(session_id, limit, user_id)
+    
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Session not found or access denied'
         )
+    
+    return ORJSONResponse({
+        'success': True,
+        'session_id': session_id,
+        'session': result['session'],
+        'messages': result['messages'],
+        'total_messages': len(result['messages'])
+    }, headers=headers)
 
 
 @chat_router.get('/sessions')
-async def get_user_sessions(
+def get_user_sessions(
+    request: Request,
     limit: int = 20,
     offset: int = 0,
-    current_user: dict = Depends(get_current_user)
+    user_id: Optional[str] = Depends(get_chat_user_id),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
-    """Get all sessions for a user"""
-    try:
-        user_id = extract_user_id(current_user)
-        
+    """Get all sessions for a user (ETag-aware, briefly cached)"""
+    cached = session_list_cache.get(user_id, (limit, offset))
+    if cached:
+        body, etag = cached
+    else:
         result = chat_service.get_user_sessions(user_id, limit, offset)
-        
-        return {
+        body = orjson.dumps({
             'success': True,
             **result
-        }
-        
-    except Exception as e:
-        print(f"Error getting user sessions: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+        })
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        session_list_cache.put(user_id, (limit, offset), body, etag)
+    
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=body, media_type='application/json', headers=headers)
 
 
 @chat_router.get('/session/{session_id}')
-async def get_session(
+def get_session(
     session_id: str,
-    current_user: dict = Depends(get_current_user)
+    user_id: Optional[str] = Depends(get_chat_user_id),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
     """Get session details"""
-    try:
-        user_id = extract_user_id(current_user)
-        result = chat_service.get_session_history(session_id, limit=0, user_id=user_id)
-        
-        if not result:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail='Session not found or access denied'
-            )
-        
-        return {
-            'success': True,
-            **result['session']
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error getting session: {e}")
+    session = chat_service.get_session_meta(session_id, user_id)
+    
+    if not session:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Session not found or access denied'
         )
+    
+    return ORJSONResponse({
+        'success': True,
+        **session
+    })
 
 
 @chat_router.patch('/session/{session_id}/title')
-async def update_session_title(
+def update_session_title(
     session_id: str,
     request: UpdateSessionTitleRequest,
-    current_user: dict = Depends(get_current_user)
+    user_id: Optional[str] = Depends(get_chat_user_id),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
     """Update session title"""
-    try:
-        user_id = extract_user_id(current_user)
-        
-        # Validate ownership
-        session = chat_service.chat_db.get_session(session_id)
-        if not session:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Session not found"
-            )
-        if session.get('user_id') != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied - you don't own this session"
-            )
-        
-        # Update title
-        success = chat_service.chat_db.update_session_title(session_id, request.title)
-        
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to update session title"
-            )
-        
-        return {
-            'success': True,
-            'message': 'Session title updated successfully',
-            'title': request.title
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error updating session title: {e}")
+    # Validate ownership
+    session = chat_service.chat_db.get_session(session_id)
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+    if session.get('user_id') != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied - you don't own this session"
+        )
+    
+    # Update title
+    success = chat_service.chat_db.update_session_title(session_id, request.title)
+    session_list_cache.invalidate(user_id)
+    
+    if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            detail="Failed to update session title"
         )
+    
+    return ORJSONResponse({
+        'success': True,
+        'message': 'Session title updated successfully',
+        'title': request.title
+    })
 
 
 @chat_router.delete('/session/{session_id}')
-async def delete_session(
+def delete_session(
     session_id: str,
-    current_user: dict = Depends(get_current_user)
+    user_id: Optional[str] = Depends(get_chat_user_id),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
     """Delete a session"""
-    try:
-        user_id = extract_user_id(current_user)
-        success = chat_service.delete_session(session_id, user_id)
-        
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail='Session not found, already deleted, or access denied'
-            )
-        
-        return {
-            'success': True,
-            'message': 'Session deleted successfully'
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error deleting session: {e}")
+    success = chat_service.delete_session(session_id, user_id)
+    session_list_cache.invalidate(user_id)
+    
+    if not success:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Session not found, already deleted, or access denied'
         )
+    
+    return ORJSONResponse({
+        'success': True,
+        'message': 'Session deleted successfully'
+    })
 
 
 @chat_router.get('/quota')
-async def get_user_quota(
-    current_user: dict = Depends(get_current_user)
+def get_user_quota(
+    user_id: Optional[str] = Depends(get_chat_user_id),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
     """
     Get current user's token quota balance.
@@ -406,67 +434,58 @@ async def get_user_quota(
     - tier: User's quota tier (free, pro, enterprise)
     - resets_at: When the quota resets
     """
+    from utils.quota_client import QuotaClientSync
+    import os
+    
+    # Check if quota service is enabled
+    quota_enabled = os.getenv("QUOTA_ENABLED", "true").lower() == "true"
+    if not quota_enabled:
+        return ORJSONResponse({
+            'success': True,
+            'quota_enabled': False,
+            'message': 'Quota tracking is disabled'
+        })
+    
+    quota_client = QuotaClientSync()
+    
     try:
-        from utils.quota_client import QuotaClientSync
-        import os
-        
-        user_id = extract_user_id(current_user)
-        
-        # Check if quota service is enabled
-        quota_enabled = os.getenv("QUOTA_ENABLED", "true").lower() == "true"
-        if not quota_enabled:
-            return {
-                'success': True,
-                'quota_enabled': False,
-                'message': 'Quota tracking is disabled'
-            }
-        
-        quota_client = QuotaClientSync()
-        
-        try:
-            import httpx
-            with httpx.Client(timeout=5.0) as client:
-                response = client.get(
-                    f"{quota_client.base_url}/quota/balance/{user_id}"
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                return {
-                    'success': True,
-                    'quota_enabled': True,
-                    'user_id': user_id,
-                    'remaining_tokens': data.get('remaining_tokens', 0),
-                    'monthly_limit': data.get('monthly_limit', 0),
-                    'current_usage': data.get('current_usage', 0),
-                    'percentage_used': data.get('percentage_used', 0),
-                    'tier': data.get('tier', 'free'),
-                    'resets_at': data.get('resets_at'),
-                    'warning': data.get('warning', False),
-                    'warning_message': data.get('warning_message')
-                }
-        except Exception as e:
-            # Quota service unavailable
-            return {
+        import httpx
+        with httpx.Client(timeout=5.0) as client:
+            response = client.get(
+                f"{quota_client.base_url}/quota/balance/{user_id}"
+            )
+            response.raise_for_status()
+            data = response.json()
+            
+            return ORJSONResponse({
                 'success': True,
                 'quota_enabled': True,
-                'quota_service_available': False,
-                'message': f'Quota service unavailable: {str(e)}'
-            }
-            
+                'user_id': user_id,
+                'remaining_tokens': data.get('remaining_tokens', 0),
+                'monthly_limit': data.get('monthly_limit', 0),
+                'current_usage': data.get('current_usage', 0),
+                'percentage_used': data.get('percentage_used', 0),
+                'tier': data.get('tier', 'free'),
+                'resets_at': data.get('resets_at'),
+                'warning': data.get('warning', False),
+                'warning_message': data.get('warning_message')
+            })
     except Exception as e:
-        print(f"Error getting quota: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+        # Quota service unavailable
+        return ORJSONResponse({
+            'success': True,
+            'quota_enabled': True,
+            'quota_service_available': False,
+            'message': f'Quota service unavailable: {str(e)}'
+        })
 
 
 @chat_router.websocket('/ws/{session_id}/stream')
 async def websocket_stream_endpoint(
     websocket,
     session_id: str,
-    current_user: dict = Depends(get_current_user)
+    user_id: Optional[str] = Depends(get_chat_user_id),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
     """
     WebSocket endpoint for streaming chat responses.
@@ -481,8 +500,6 @@ async def websocket_stream_endpoint(
     from fastapi import WebSocketException
     
     try:
-        # Check JWT authentication
-        user_id = extract_user_id(current_user)
         print(f"[WebSocket] Stream connection from user_id: {user_id}, session: {session_id}")
         
         # The message comes from the frontend via the query parameter
@@ -515,6 +532,7 @@ async def websocket_stream_endpoint(
                 print(f"[WebSocket] Error sending chunk: {send_error}")
                 break
         
+        session_list_cache.invalidate(user_id)
         print(f"[WebSocket] Streaming complete for session: {session_id}")
         await websocket.close(code=1000)
         
@@ -526,9 +544,7 @@ async def websocket_stream_endpoint(
         except:
             pass
     except Exception as e:
-        print(f"[WebSocket] Error in stream endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[WebSocket] Error in stream endpoint")
         try:
             await websocket.send_json({"type": "error", "content": str(e)})
             await websocket.close(code=1011)
@@ -1,14 +1,19 @@
 """Knowledge base API endpoints."""
 import os
 import glob
-import uuid
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, status, Header, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, Header, Depends
+from fastapi.responses import ORJSONResponse
 from typing import Optional
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List, Dict, Any
+from pydantic import Field, field_validator
+from pydantic.dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Tuple
 from database.operations import insert_document, replace_document, delete_document_and_chunks
-from database.document_db import DocumentDatabase
+from database.document_db import get_document_db
+from utils.id_utils import uuid7
 from services.weaviate_service import query_weaviate
 from middleware.security_middleware import (
     validate_string_length,
@@ -17,13 +22,61 @@ from middleware.security_middleware import (
     MAX_FILENAME_LENGTH
 )
 from middleware.rbac import Roles, require_roles, require_admin, require_manager_or_above
+import logging
 import traceback
 
+logger = logging.getLogger(__name__)
+
 kb_router = APIRouter(prefix='/kb', tags=['knowledge-base'])
 
-# Request models with validation
-class UploadToKBRequest(BaseModel):
-    chunks: List[Dict[str, Any]] = Field(..., min_length=1, max_length=10000)
+
+class QueryResultCache:
+    """
+    Short-lived cache of /query results keyed on (query, limit, generate_answer).
+    Frontends repeat identical questions; a hit skips the hybrid search, rerank
+    and answer generation. Cleared whenever the knowledge base contents change.
+    """
+    
+    def __init__(self, ttl_seconds: int = 30, max_entries: int = 512):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[str, int, bool], Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key: Tuple[str, int, bool]) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            result, expires_at = entry
+            if time.time() >= expires_at:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return result
+    
+    def put(self, key: Tuple[str, int, bool], result: Dict[str, Any]):
+        with self.lock:
+            self.entries[key] = (result, time.time() + self.ttl_seconds)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Global query result cache instance
+query_result_cache = QueryResultCache()
+
+# Request models with validation. Slotted, frozen pydantic dataclasses: same
+# validation as BaseModel, but no per-instance __dict__ and read-only fields.
+@dataclass(slots=True, frozen=True, kw_only=True)
+class UploadToKBRequest:
+    # Plain list: only the length and element type are checked, the chunk dicts
+    # are passed through as decoded instead of being validated and copied one by one
+    chunks: list = Field(..., min_length=1, max_length=10000)
     document_metadata: Dict[str, Any] = Field(default_factory=dict)
     source_filename: str = Field(..., min_length=1, max_length=MAX_FILENAME_LENGTH)
     content_hash: Optional[str] = Field(None, description="SHA256 hash of file content for duplicate detection")
@@ -40,13 +93,12 @@ class UploadToKBRequest(BaseModel):
     @field_validator('chunks')
     @classmethod
     def validate_chunks(cls, v):
-        if not v:
-            raise ValueError("At least one chunk is required")
-        if len(v) > 10000:
-            raise ValueError("Maximum 10000 chunks allowed per document")
+        if not all(isinstance(chunk, dict) for chunk in v):
+            raise ValueError("Each chunk must be an object")
         return v
 
-class QueryRequest(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class QueryRequest:
     query: str = Field(..., min_length=1, max_length=MAX_QUERY_LENGTH)
     limit: Optional[int] = Field(5, ge=1, le=100)
     generate_answer: Optional[bool] = True
@@ -59,10 +111,52 @@ class QueryRequest(BaseModel):
         return validate_string_length(v.strip(), MAX_QUERY_LENGTH, "query")
 
 
-@kb_router.post('/upload-to-kb')
-async def upload_to_kb(
+def _ingest_document(
+    doc_id: str,
+    file_metadata: Dict[str, Any],
+    chunks: list,
+    replaced_weaviate_doc_id: Optional[str] = None
+):
+    """
+    Background half of /upload-to-kb: write the chunks to Weaviate (removing the
+    replaced document's chunks first) and mark the pending record complete or failed.
+    insert_document raises if any chunk could not be stored, so "complete"
+    always means every chunk is searchable.
+    """
+    doc_db = get_document_db()
+    
+    try:
+        if replaced_weaviate_doc_id:
+            try:
+                delete_document_and_chunks(replaced_weaviate_doc_id)
+                logger.info("Deleted from Weaviate: %s", replaced_weaviate_doc_id)
+            except Exception as e:
+                logger.warning("Failed to delete from Weaviate (may not exist): %s", e)
+        
+        weaviate_doc_id = insert_document(file_metadata, chunks)
+    except Exception:
+        logger.exception(
+            "Weaviate ingest failed - doc_id: %s, filename: %s, chunks: %d",
+            doc_id, file_metadata["file_name"], len(chunks)
+        )
+        doc_db.update_document(doc_id, {"status": "failed"})
+        query_result_cache.clear()  # Replaced chunks may already be gone
+        return
+    
+    if not doc_db.update_document(doc_id, {"weaviate_doc_id": weaviate_doc_id, "status": "complete"}):
+        # Record was deleted while ingesting; don't leave its chunks searchable
+        logger.warning("Document %s was removed during ingest, deleting Weaviate doc %s", doc_id, weaviate_doc_id)
+        delete_document_and_chunks(weaviate_doc_id)
+        return
+    
+    query_result_cache.clear()
+    logger.info("Ingested %d chunks for document %s (Weaviate doc_id: %s)", len(chunks), doc_id, weaviate_doc_id)
+
+
+@kb_router.post('/upload-to-kb', status_code=status.HTTP_202_ACCEPTED)
+def upload_to_kb(
     request: UploadToKBRequest,
-    authorization: Optional[str] = Header(None),
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(require_manager_or_above)  # Only managers/admins can upload
 ):
     """
@@ -71,6 +165,10 @@ async def upload_to_kb(
     IMPORTANT: Duplicate detection happens in /pdf/parse-pdf endpoint to save parsing costs.
     This endpoint focuses on uploading pre-validated chunks to Weaviate and tracking in local database.
     
+    The document record is saved with status "pending" and the Weaviate ingest
+    runs as a background task after the response; poll status_url
+    (GET /kb/status/{doc_id}) until it reports "complete" or "failed".
+    
     Expects JSON body with:
     - chunks: list of chunk objects (required)
     - document_metadata: document metadata dict
@@ -79,15 +177,9 @@ async def upload_to_kb(
     - file_size_bytes: file size in bytes (saved to local DB only)
     - force_replace (optional): if true, replace existing document
     
-    Returns success status and document ID.
+    Returns 202 Accepted with the document ID and status URL.
     """
-    # DEBUG: Log what we received
-    print(f"[DEBUG] Upload request received:")
-    print(f"[DEBUG] - source_filename: {request.source_filename}")
-    print(f"[DEBUG] - content_hash: {request.content_hash}")
-    print(f"[DEBUG] - file_size_bytes: {request.file_size_bytes}")
-    print(f"[DEBUG] - chunks count: {len(request.chunks)}")
-    print(f"[DEBUG] - force_replace: {request.force_replace}")
+    started = time.perf_counter()
     
     if not request.chunks:
         raise HTTPException(
@@ -95,56 +187,46 @@ async def upload_to_kb(
             detail="No chunks provided"
         )
     
-    # Extract user from JWT token
-    uploaded_by = None  # Will be set if token is valid
-    
-    if authorization:
-        try:
-            token = authorization.replace("Bearer ", "")
-            
-            # Google OAuth uses RS256, not HS256, so we need to decode WITHOUT verification
-            # The token was already verified by the auth server
-            import jwt as jose_jwt
-            payload = jose_jwt.decode(token, options={"verify_signature": False})
-            
-            # Extract name from JWT payload
-            uploaded_by = payload.get("name") or payload.get("email")
-            
-            if uploaded_by:
-                print(f"[DEBUG] ✅ Successfully extracted uploaded_by: {uploaded_by}")
-                print(f"[DEBUG] JWT payload keys: {list(payload.keys())}")
-            else:
-                print(f"[WARNING] ⚠️ JWT payload missing 'name' and 'email' fields")
-                print(f"[WARNING] Available fields: {list(payload.keys())}")
-                
-        except Exception as e:
-            print(f"[WARNING] ⚠️ Failed to decode JWT token: {str(e)}")
-            uploaded_by = None
-    else:
-        print(f"[WARNING] ⚠️ No authorization header provided")
+    # Extract user from the JWT payload already verified (and cached) by get_current_user
+    uploaded_by = current_user.get("name") or current_user.get("email")
     
-    # Final check - if still None, we have a problem
     if not uploaded_by:
-        print(f"[ERROR] ❌ Could not extract user information from JWT token")
+        logger.error("JWT payload missing 'name' and 'email' fields; available fields: %s", list(current_user))
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication required. Please provide a valid JWT token with user information."
         )
     
+    # One structured record per upload outcome (also passed as `extra` for log processors)
+    log_ctx = {
+        "file_name": request.source_filename,
+        "chunks": len(request.chunks),
+        "content_hash": request.content_hash,
+        "force_replace": request.force_replace,
+        "uploaded_by": uploaded_by
+    }
+    
     try:
-        doc_db = DocumentDatabase()
+        doc_db = get_document_db()
         
         # ═══════════════════════════════════════════════════════════════════════
         # NOTE: Primary duplicate detection happens in /pdf/parse-pdf endpoint
         # to save parsing costs. This endpoint handles force_replace for updates.
         # ═══════════════════════════════════════════════════════════════════════
         
+        # A previous upload of this file whose ingest failed never reached the
+        # knowledge base; drop it so it is neither a duplicate nor a conflict
+        doc_db.delete_failed_documents(request.source_filename, request.content_hash)
+        
         # Check if we need to replace an existing document
         existing_doc = doc_db.check_duplicate_by_filename(request.source_filename)
         
         if existing_doc and not request.force_replace:
             # This shouldn't normally happen if parse-pdf was called first,
             # but handle it gracefully for direct API calls
+            log_ctx["existing_doc_id"] = existing_doc["doc_id"]
+            log_ctx["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            logger.warning("kb.upload.duplicate %s", log_ctx, extra=log_ctx)
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail={
@@ -155,32 +237,36 @@ async def upload_to_kb(
                 }
             )
         
-        # Prepare file metadata for Weaviate Document collection (minimal fields only)
-        file_metadata = {
-            "file_name": request.source_filename,
-            "page_count": request.document_metadata.get('total_pages', 0) or max(
-                (chunk.get('metadata', {}).get('page', 0) for chunk in request.chunks), 
-                default=0
-            )
-        }
-        
         # Get current timestamp for created_at
         current_timestamp = datetime.now().isoformat()
         
         # Remove file extension for cleaner chunk_id prefix
         base_filename = os.path.splitext(request.source_filename)[0]
         
-        # Add chunk_id and created_at to each chunk if not present
+        # Single pass over the chunks: add chunk_id and created_at if not present,
+        # and track the highest page for documents without total_pages
+        max_page = 0
         for i, chunk in enumerate(request.chunks):
             # Ensure chunk_id includes the filename for proper document grouping
             if not chunk.get('chunk_id'):
                 chunk['chunk_id'] = f"{base_filename}-chunk-{i}"
             
             # Ensure created_at is set for new uploads
-            if not chunk.get('metadata'):
-                chunk['metadata'] = {}
-            if not chunk['metadata'].get('created_at'):
-                chunk['metadata']['created_at'] = current_timestamp
+            chunk_meta = chunk.get('metadata')
+            if not chunk_meta:
+                chunk_meta = chunk['metadata'] = {}
+            if not chunk_meta.get('created_at'):
+                chunk_meta['created_at'] = current_timestamp
+            
+            page = chunk_meta.get('page') or 0
+            if page > max_page:
+                max_page = page
+        
+        # Prepare file metadata for Weaviate Document collection (minimal fields only)
+        file_metadata = {
+            "file_name": request.source_filename,
+            "page_count": request.document_metadata.get('total_pages', 0) or max_page
+        }
         
         # ═══════════════════════════════════════════════════════════════════════
         # DOCUMENT REPLACEMENT/INSERTION LOGIC
@@ -188,17 +274,14 @@ async def upload_to_kb(
         
         action = "uploaded"
         version_info = None
+        replaced_weaviate_doc_id = None
         
         if existing_doc and request.force_replace:
-            print(f"[INFO] Replacing existing document: {existing_doc['file_name']} (ID: {existing_doc['doc_id']})")
-            
             # Get current version before archiving
             current_doc_version = existing_doc.get('current_version', 1)
             
             # Archive the current version before replacing
-            version_id = doc_db.archive_document_version(existing_doc['doc_id'], replaced_by=uploaded_by)
-            if version_id:
-                print(f"[INFO] Archived previous version: {version_id}")
+            log_ctx["archived_version_id"] = doc_db.archive_document_version(existing_doc['doc_id'], replaced_by=uploaded_by)
             
             # Get next version number
             next_version = doc_db.get_next_version_number(request.source_filename)
@@ -213,25 +296,15 @@ async def upload_to_kb(
                 }
             }
             
-            # Delete from SQLite document database
-            doc_db.delete_document(existing_doc['doc_id'])
-            # Delete from Weaviate using weaviate_doc_id
-            try:
-                weaviate_id = existing_doc.get('weaviate_doc_id')
-                if weaviate_id:
-                    delete_document_and_chunks(weaviate_id)
-                    print(f"[INFO] Deleted from Weaviate: {weaviate_id}")
-                else:
-                    print(f"[WARN] No weaviate_doc_id found for document {existing_doc['doc_id']}")
-            except Exception as e:
-                print(f"[WARN] Failed to delete from Weaviate (may not exist): {e}")
+            # The SQLite record is replaced in place by upsert_document below;
+            # the old Weaviate chunks are deleted by the background ingest
+            replaced_weaviate_doc_id = existing_doc.get('weaviate_doc_id')
+            if not replaced_weaviate_doc_id:
+                logger.warning("No weaviate_doc_id found for document %s", existing_doc['doc_id'])
             action = "replaced"
         
-        # Insert new document to Weaviate
-        weaviate_doc_id = insert_document(file_metadata, request.chunks)
-        
         # Save to document tracking database
-        doc_id = str(uuid.uuid4())  # Separate ID for our database
+        doc_id = str(uuid7())  # Separate ID for our database (time-ordered)
         
         # Generate a temporary hash if not provided (use doc_id to ensure uniqueness)
         content_hash = request.content_hash or f"temp-{doc_id}"
@@ -239,7 +312,9 @@ async def upload_to_kb(
         # Determine version number
         current_version = version_info['new_version'] if version_info else 1
         
-        doc_db.insert_document({
+        # A re-upload overwrites the existing record for this filename in one statement
+        save_document = doc_db.upsert_document if existing_doc else doc_db.insert_document
+        save_document({
             "doc_id": doc_id,
             "file_name": request.source_filename,
             "file_size_bytes": request.file_size_bytes or 0,
@@ -247,42 +322,81 @@ async def upload_to_kb(
             "uploaded_by": uploaded_by,
             "content_hash": content_hash,
             "page_count": file_metadata["page_count"],
-            "weaviate_doc_id": weaviate_doc_id,
-            "metadata": request.document_metadata
+            "weaviate_doc_id": None,  # Set by _ingest_document
+            "metadata": request.document_metadata,
+            "status": "pending"
         }, version=current_version)
         
-        print(f"[INFO] Successfully {action} {len(request.chunks)} chunks to knowledge base")
-        print(f"[INFO] Document saved to database: {doc_id} (Version {current_version})")
-        print(f"[INFO] Weaviate doc_id: {weaviate_doc_id}")
-        print(f"[INFO] Uploaded by: {uploaded_by or 'anonymous'}")
+        # Weaviate ingest runs after the response is sent
+        background_tasks.add_task(
+            _ingest_document, doc_id, file_metadata, request.chunks, replaced_weaviate_doc_id
+        )
+        
+        log_ctx.update(
+            doc_id=doc_id,
+            action=action,
+            version=current_version,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+        logger.info("kb.upload %s", log_ctx, extra=log_ctx)
         
-        return {
+        return ORJSONResponse({
             "success": True, 
-            "message": f"Successfully {action} {len(request.chunks)} chunks to knowledge base",
+            "message": f"Accepted {len(request.chunks)} chunks for knowledge base ({action})",
             "doc_id": doc_id,
-            "weaviate_doc_id": weaviate_doc_id,
+            "status": "pending",
+            "status_url": f"/kb/status/{doc_id}",
             "action": action,
             "version": current_version,
             "version_info": version_info
-        }
+        }, status_code=status.HTTP_202_ACCEPTED)
         
     except HTTPException:
         # Re-raise HTTP exceptions (like 409 Conflict)
         raise
     except Exception as e:
-        print(f"[ERROR] Failed to upload to knowledge base: {str(e)}")
-        print(f"[ERROR] Request data - filename: {request.source_filename}, chunks: {len(request.chunks)}, content_hash: {request.content_hash}, file_size: {request.file_size_bytes}")
-        traceback.print_exc()
+        log_ctx["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.exception("kb.upload.failed %s", log_ctx, extra=log_ctx)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal server error: {str(e)}"
         )
 
 
+@kb_router.get('/status/{doc_id}')
+def get_upload_status(
+    doc_id: str,
+    current_user: dict = Depends(require_manager_or_above)
+):
+    """
+    Get the ingest status of an uploaded document.
+    
+    Returns status "pending" while the background Weaviate ingest is running,
+    then "complete" (with weaviate_doc_id) or "failed".
+    """
+    doc_info = get_document_db().get_document(doc_id)
+    
+    if not doc_info:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document with ID '{doc_id}' not found"
+        )
+    
+    return ORJSONResponse({
+        "success": True,
+        "doc_id": doc_id,
+        "file_name": doc_info["file_name"],
+        "status": doc_info["status"],
+        "weaviate_doc_id": doc_info["weaviate_doc_id"],
+        "chunks": doc_info["chunks"]
+    })
+
+
 @kb_router.get('/list-kb')
-async def list_kb_files(
+def list_kb_files(
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
     uploaded_by: Optional[str] = None,
     order_by: str = "upload_date",
     order_dir: str = "DESC",
@@ -294,6 +408,8 @@ async def list_kb_files(
     Query params:
     - limit: Maximum number of results (default: 100)
     - offset: Number of results to skip for pagination (default: 0)
+    - cursor: next_cursor from the previous page; replaces offset so deep
+      pages don't scan skipped rows (order_by=upload_date only)
     - uploaded_by: Filter by user (optional)
     - order_by: Field to sort by (default: upload_date)
     - order_dir: Sort direction ASC/DESC (default: DESC)
@@ -306,55 +422,69 @@ async def list_kb_files(
     - uploaded_by: User who uploaded the file
     """
     try:
-        doc_db = DocumentDatabase()
-        
-        # Get documents from database
+        doc_db = get_document_db()
+        
+        # Cursor is "<upload_date>|<doc_id>" of the last row already returned
+        after = None
+        if cursor:
+            if order_by != "upload_date":
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="cursor can only be used with order_by=upload_date"
+                )
+            upload_date, _, doc_id = cursor.partition("|")
+            if not upload_date or not doc_id:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            after = (upload_date, doc_id)
+        
+        # Get documents from database (file_size_formatted is computed in SQL)
         documents = doc_db.list_documents(
             limit=limit,
             offset=offset,
             uploaded_by=uploaded_by,
             order_by=order_by,
-            order_dir=order_dir
+            order_dir=order_dir,
+            after=after
         )
         
         # Get total count for pagination
         total_count = doc_db.get_document_count(uploaded_by=uploaded_by)
         
-        # Format response with human-readable file sizes
-        formatted_docs = []
-        for doc in documents:
-            # Convert bytes to readable format
-            size_bytes = doc["file_size_bytes"]
-            if size_bytes < 1024:
-                size_str = f"{size_bytes} B"
-            elif size_bytes < 1024 * 1024:
-                size_str = f"{size_bytes / 1024:.2f} KB"
-            else:
-                size_str = f"{size_bytes / (1024 * 1024):.2f} MB"
-            
-            formatted_docs.append({
+        formatted_docs = [
+            {
                 "doc_id": doc["doc_id"],
                 "file_name": doc["file_name"],
                 "upload_date": doc["upload_date"],
                 "file_size_bytes": doc["file_size_bytes"],
-                "file_size_formatted": size_str,
+                "file_size_formatted": doc["file_size_formatted"],
                 "chunks": doc["chunks"],
                 "uploaded_by": doc["uploaded_by"] or "anonymous",
-                "page_count": doc.get("page_count")
-            })
+                "page_count": doc["page_count"],
+                "status": doc["status"]
+            }
+            for doc in documents
+        ]
         
-        return {
+        # Keyset pagination only follows the upload_date ordering
+        next_cursor = None
+        if order_by == "upload_date" and len(documents) == limit:
+            last = documents[-1]
+            next_cursor = f"{last['upload_date']}|{last['doc_id']}"
+        
+        return ORJSONResponse({
             "success": True,
             "total_count": total_count,
             "count": len(formatted_docs),
-            "offset": offset,
+            "offset": 0 if after else offset,  # a cursor replaces the offset
             "limit": limit,
+            "next_cursor": next_cursor,
             "documents": formatted_docs
-        }
+        })
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"[ERROR] Failed to list documents: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Failed to list documents")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal server error: {str(e)}"
@@ -383,24 +513,28 @@ async def query_knowledge_base(request: QueryRequest):
         )
     
     try:
-        # Query the knowledge base
-        result = query_weaviate(
-            query_text=request.query,
-            limit=request.limit,
-            generate_answer=request.generate_answer
-        )
+        # Query the knowledge base (identical recent queries are served from cache)
+        cache_key = (request.query, request.limit, request.generate_answer)
+        result = query_result_cache.get(cache_key)
+        if result is None:
+            result = query_weaviate(
+                query_text=request.query,
+                limit=request.limit,
+                generate_answer=request.generate_answer
+            )
+            query_result_cache.put(cache_key, result)
         
-        return {
+        return ORJSONResponse({
             "success": True,
             "query": request.query,
             "results": result.get('results', []),
             "answer": result.get('answer'),
             "metadata": {
                 "result_count": len(result.get('results', [])),
-                "generated_at": datetime.now().isoformat(),
+                "generated_at": datetime.now(),  # orjson writes ISO 8601
                 "limit": request.limit
             }
-        }
+        })
         
     except Exception as e:
         print(f"[ERROR] Query failed: {str(e)}")
@@ -426,7 +560,7 @@ async def delete_document(
         Success message and deleted document info
     """
     try:
-        doc_db = DocumentDatabase()
+        doc_db = get_document_db()
         
         # Get document info before deleting
         doc_info = doc_db.get_document(doc_id)
@@ -444,6 +578,7 @@ async def delete_document(
         
         # Delete from local database
         doc_db.delete_document(doc_id)
+        query_result_cache.clear()
         
         print(f"[INFO] Successfully deleted document: {doc_id}")
         print(f"[INFO] File name: {doc_info['file_name']}")
@@ -485,7 +620,7 @@ async def get_document_versions(
     - version_history: List of archived versions
     """
     try:
-        doc_db = DocumentDatabase()
+        doc_db = get_document_db()
         
         # Get current document
         current_doc = doc_db.get_document_by_filename(file_name)
@@ -1,16 +1,19 @@
 """PDF-related API endpoints."""
 from fastapi import APIRouter, File, UploadFile, HTTPException, status, Header, Form
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
 from services.pdf_service import parse_and_chunk_pdf_file
 from database.document_validator import calculate_file_hash
-from database.document_db import DocumentDatabase
+from database.document_db import get_document_db
 from middleware.security_middleware import (
     sanitize_filename,
     validate_file_type,
     MAX_FILE_SIZE_MB,
     ALLOWED_FILE_TYPES
 )
-import traceback
+import logging
+
+logger = logging.getLogger(__name__)
 
 pdf_router = APIRouter(prefix='/pdf', tags=['pdf'])
 
@@ -36,7 +39,7 @@ async def parse_pdf(
     """
     # Convert string to boolean
     force_reparse_bool = force_reparse.lower() == 'true'
-    print(f"[DEBUG] Starting parse-pdf endpoint (force_reparse={force_reparse_bool})")
+    logger.debug("Starting parse-pdf endpoint (force_reparse=%s)", force_reparse_bool)
     
     # Validate filename exists
     if not file.filename:
@@ -55,11 +58,15 @@ async def parse_pdf(
             detail=f"File type not allowed. Accepted types: {', '.join(ALLOWED_FILE_TYPES)}"
         )
     
-    # Validate file size
-    file_bytes = await file.read()
-    file_size_mb = len(file_bytes) / (1024 * 1024)
+    # Validate file size. The multipart parser has already spooled the upload to a
+    # temp file and recorded its size, so oversized files are rejected unread;
+    # otherwise read at most one byte past the limit to detect them.
+    max_size_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
+    file_bytes = b""
+    if file.size is None or file.size <= max_size_bytes:
+        file_bytes = await file.read(max_size_bytes + 1)
     
-    if file_size_mb > MAX_FILE_SIZE_MB:
+    if (file.size or 0) > max_size_bytes or len(file_bytes) > max_size_bytes:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE_MB}MB"
@@ -73,8 +80,9 @@ async def parse_pdf(
         )
 
     try:
-        # Calculate content hash for duplicate detection
-        content_hash = calculate_file_hash(file_bytes)
+        # Calculate content hash for duplicate detection (the only full pass over
+        # the bytes before parsing; hashlib releases the GIL, so run it off the loop)
+        content_hash = await run_in_threadpool(calculate_file_hash, file_bytes)
         file_size_bytes = len(file_bytes)
         
         # ═══════════════════════════════════════════════════════════════════════
@@ -82,14 +90,14 @@ async def parse_pdf(
         # Duplicates are NOT allowed. User must explicitly choose to override.
         # ═══════════════════════════════════════════════════════════════════════
         if not force_reparse_bool:
-            doc_db = DocumentDatabase()
+            doc_db = get_document_db()
             
             # Check for any duplicate (filename OR content)
             duplicate_check = doc_db.check_duplicates(sanitized_filename, content_hash)
             
             if duplicate_check['is_duplicate']:
                 existing_doc = duplicate_check['existing_doc']
-                print(f"[DUPLICATE] {duplicate_check['message']}")
+                logger.info("Duplicate upload blocked: %s", duplicate_check['message'])
                 
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
@@ -112,30 +120,27 @@ async def parse_pdf(
         # ═══════════════════════════════════════════════════════════════════════
         # PARSE PDF - Only reached if no duplicate or force_reparse=true
         # ═══════════════════════════════════════════════════════════════════════
-        print(f"[INFO] No duplicate found or force_reparse=true. Proceeding with parsing...")
-        result = parse_and_chunk_pdf_file(file_bytes, sanitized_filename)
+        logger.info("Parsing %s (no duplicate found or force_reparse=true)", sanitized_filename)
+        # Parsing (page extraction fan-out, LLM chunking) blocks; keep it off the event loop
+        result = await run_in_threadpool(parse_and_chunk_pdf_file, file_bytes, sanitized_filename)
         
         # Add content hash and file size to the result
         result['content_hash'] = content_hash
         result['file_size_bytes'] = file_size_bytes
         
-        # DEBUG: Log what we're returning
-        print(f"[DEBUG] Result keys: {list(result.keys())}")
-        print(f"[DEBUG] content_hash: {result.get('content_hash')}")
-        print(f"[DEBUG] file_size_bytes: {result.get('file_size_bytes')}")
-        print(f"[DEBUG] chunks count: {len(result.get('chunks', []))}")
-        
         # Note: Document will be saved to database when uploaded to KB
-        print(f"[INFO] Parsing complete. Ready for upload to KB.")
+        logger.info(
+            "Parsing complete for %s: %d chunks, content_hash=%s, file_size_bytes=%d",
+            sanitized_filename, len(result.get('chunks', [])), content_hash, file_size_bytes
+        )
         
         return result
 
     except HTTPException:
         # Re-raise HTTP exceptions (like 409 Conflict) without modification
         raise
-    except Exception as e:
-        print(f"\n[ERROR] PDF processing failed: {str(e)}")
-        traceback.print_exc()
+    except Exception:
+        logger.exception("PDF processing failed for %s", sanitized_filename)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to process PDF file. Please ensure the file is a valid PDF."
@@ -2,19 +2,65 @@
 FastAPI application entry point for PDF processing and knowledge base system.
 This file initializes the FastAPI app and registers all routes.
 """
+import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+from anyio import to_thread
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from api.routes import register_routes
 from api.chat_routes import chat_router
 from api.admin_routes import admin_router
+from services.chat_service import ChatService, SessionNotFound, SessionAccessDenied
+from services.pdf_service import shutdown_page_extraction_pool
+from utils.llm_error_handler import LLMServiceException
+from utils.quota_client import UserDeactivatedException
 from config import Config
 from database.weaviate_client import get_weaviate_client
 from middleware.security_middleware import (
     rate_limit_middleware, 
-    security_headers_middleware
+    security_headers_middleware,
+    upload_size_limit_middleware
 )
 import atexit
 
+logger = logging.getLogger(__name__)
+
+def start_logging() -> QueueListener:
+    """
+    Send application log records through a queue; a listener thread does the
+    formatting and stderr writes, so request threads never wait on them.
+    """
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    
+    logging.getLogger().addHandler(QueueHandler(log_queue))
+    # Third-party libraries stay at the root WARNING level
+    for package in ("api", "services", "database", "middleware", "utils"):
+        logging.getLogger(package).setLevel(Config.LOG_LEVEL)
+    
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hooks for the FastAPI application"""
+    log_listener = start_logging()
+    
+    # Sync route handlers (blocking DB/OpenAI calls) run in AnyIO's worker threads
+    to_thread.current_default_thread_limiter().total_tokens = Config.THREADPOOL_SIZE
+    
+    # One ChatService (DB, Weaviate, OpenAI clients) per worker, built at startup
+    app.state.chat_service = ChatService()
+    yield
+    
+    shutdown_page_extraction_pool()
+    log_listener.stop()
+
 def create_app():
     """Create and configure the FastAPI application"""
     # Validate configuration at startup
@@ -25,8 +71,9 @@ def create_app():
         title="PDF Processing and Knowledge Base API",
         description="API for PDF processing, knowledge base management, and chat functionality",
         version="1.0.0",
-        # Limit request body size to 10MB (10 * 1024 * 1024 bytes)
-        max_request_size=10 * 1024 * 1024
+        # orjson serializes response dicts much faster than stdlib json
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
     )
     
     # Security Middleware (Applied in order - only if rate limiting enabled)
@@ -40,6 +87,20 @@ def create_app():
     else:
         print("⚠ Rate limiting disabled")
     
+    # 3. Upload size limit (FastAPI has no request body size setting)
+    app.middleware("http")(upload_size_limit_middleware)
+    
+    # 4. Unexpected errors. Handled here rather than in an Exception handler:
+    # those run in ServerErrorMiddleware, outside CORSMiddleware, so the
+    # browser would get a 500 without CORS headers.
+    @app.middleware("http")
+    async def unhandled_error_middleware(request: Request, call_next):
+        try:
+            return await call_next(request)
+        except Exception:
+            logger.exception("Error handling %s %s", request.method, request.url.path)
+            return ORJSONResponse(status_code=500, content={'detail': 'Internal server error'})
+    
     # CORS Configuration - This is the ONLY place where CORS is configured
     # To add your frontend port:
     #   1. For development: Add it to the list below
@@ -76,6 +137,28 @@ def create_app():
     
     print(f"✓ CORS configured for origins: {allowed_origins}")
     
+    # Route handlers let service errors propagate to these app-wide handlers
+    @app.exception_handler(LLMServiceException)
+    async def llm_service_exception_handler(request: Request, exc: LLMServiceException):
+        # Structured LLM error for the frontend popup
+        print(f"🔴 LLM Error: {exc}")
+        return ORJSONResponse(
+            status_code=exc.status_code,
+            content={'success': False, **exc.to_dict()}
+        )
+    
+    @app.exception_handler(SessionNotFound)
+    async def session_not_found_handler(request: Request, exc: SessionNotFound):
+        return ORJSONResponse(status_code=404, content={'detail': str(exc)})
+    
+    @app.exception_handler(SessionAccessDenied)
+    async def session_access_denied_handler(request: Request, exc: SessionAccessDenied):
+        return ORJSONResponse(status_code=403, content={'detail': str(exc)})
+    
+    @app.exception_handler(UserDeactivatedException)
+    async def user_deactivated_handler(request: Request, exc: UserDeactivatedException):
+        return ORJSONResponse(status_code=403, content={'detail': f"Access denied: {exc.message}"})
+    
     # Register all routes (PDF processing, KB management)
     register_routes(app)
     
@@ -41,6 +41,7 @@ class Config:
     
     # Processing Configuration
     BATCH_SIZE = 100
+    BATCH_CONCURRENT_REQUESTS = int(os.environ.get("BATCH_CONCURRENT_REQUESTS", "4"))  # Parallel Weaviate batch requests
     MAX_TOKENS = 1000
     TEMPERATURE = 0.0
     TOP_M_RERANK = 10
@@ -53,10 +54,15 @@ class Config:
     GAP_MULTIPLIER = 1.5
     MATCH_SCORE_THRESHOLD = 80
     CROSS_PAGE_LINE_WINDOW = 20
+    PDF_PAGES_PER_TASK = 5  # Pages per page-extraction task
+    PDF_PARSE_WORKERS = int(os.environ.get("PDF_PARSE_WORKERS", os.cpu_count() or 1))  # Page-extraction processes
+    IMAGE_ANALYSIS_CONCURRENCY = int(os.environ.get("IMAGE_ANALYSIS_CONCURRENCY", "4"))  # Parallel vision-model calls per document
     
     # FastAPI Configuration
     DEBUG = True
     PORT = 8009
+    THREADPOOL_SIZE = int(os.environ.get("THREADPOOL_SIZE", "200"))  # Worker threads for sync handlers
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()  # Level for the application loggers
     
     # File paths (absolute paths based on this file's location)
     OUTPUT_DIR = str(BASE_DIR / "outputs")
@@ -0,0 +1,63 @@
+"""
+Entry module for the page-extraction worker processes.
+
+Spawned workers re-import the parent's __main__ before running any task. When
+the API is started with `python app.py` that is app.py, which would build the
+app, connect to Weaviate and create the OpenAI/quota clients in every worker.
+Workers are started with this module standing in as __main__ instead, so they
+import only the extraction code.
+"""
+import io
+import sys
+import threading
+from multiprocessing.context import SpawnContext, SpawnProcess
+
+import pdfplumber
+
+from core.pdf_extractor import extract_pages
+
+# sys.modules["__main__"] is process-wide; only one worker starts at a time
+_main_swap_lock = threading.Lock()
+
+# Document this worker last read: (pdf_path, file_bytes, pdfplumber document).
+# A document's page ranges usually land on the same workers back to back, so
+# each worker reads and opens it once instead of once per task.
+_current_document = None
+
+
+class WorkerProcess(SpawnProcess):
+    """Spawned process that imports this module as its __main__"""
+
+    def start(self):
+        with _main_swap_lock:
+            parent_main = sys.modules["__main__"]
+            sys.modules["__main__"] = sys.modules[__name__]
+            try:
+                super().start()
+            finally:
+                sys.modules["__main__"] = parent_main
+
+
+class WorkerContext(SpawnContext):
+    """"spawn" start method using WorkerProcess"""
+    Process = WorkerProcess
+
+
+def _open_document(pdf_path):
+    """Read and open pdf_path, reusing this worker's copy if it is the same file"""
+    global _current_document
+    if _current_document is None or _current_document[0] != pdf_path:
+        if _current_document is not None:
+            _current_document[2].close()
+            _current_document = None
+        # Read into memory so the parent can delete the file while we work
+        with open(pdf_path, "rb") as f:
+            file_bytes = f.read()
+        _current_document = (pdf_path, file_bytes, pdfplumber.open(io.BytesIO(file_bytes)))
+    return _current_document
+
+
+def extract_page_range_from_file(pdf_path, first_page, last_page):
+    """Worker task: extract pages [first_page, last_page) of the PDF at pdf_path"""
+    _, file_bytes, pdf = _open_document(pdf_path)
+    return extract_pages(pdf, file_bytes, first_page, last_page)
@@ -263,6 +263,33 @@ def assemble_elements(file_bytes, page, page_number):
     return elements
 
 
+def extract_page_range(file_bytes, first_page, last_page):
+    """
+    Assemble the elements of pages [first_page, last_page) in reading order,
+    tagged with page number and page size. Pages are independent, so ranges
+    can be extracted in separate worker processes and concatenated.
+    """
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        return extract_pages(pdf, file_bytes, first_page, last_page)
+
+
+def extract_pages(pdf, file_bytes, first_page, last_page):
+    """extract_page_range for an already opened pdfplumber document"""
+    structured = []
+
+    for i in range(first_page, last_page):
+        page = pdf.pages[i]
+        page_elems = assemble_elements(file_bytes, page, i)
+
+        for el in page_elems:
+            el["page"] = i + 1
+            el["page_width"] = page.width
+            el["page_height"] = page.height
+        structured.extend(page_elems)
+
+    return structured
+
+
 def build_simplified_view_from_elements(elements, gap_multiplier=1.5):
     """
     Build a simplified string preserving structure:
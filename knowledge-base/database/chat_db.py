@@ -77,6 +77,57 @@ class ChatDatabase:
             'message_count': 0
         }
     
+    def create_session_with_message(
+        self,
+        user_id: str,
+        title: Optional[str],
+        content: str
+    ) -> tuple[Dict, Dict]:
+        """
+        Create a session and save its first user message in one transaction.
+        Applies the same auto-title rule as save_message.
+        """
+        session_id = str(uuid.uuid4())
+        message_id = str(uuid.uuid4())
+        now = datetime.now(timezone.utc).isoformat()
+        
+        if not title or title == "New Chat":
+            title = content[:50] + "..." if len(content) > 50 else content
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO sessions (session_id, user_id, title, created_at, updated_at, message_count, metadata)
+            VALUES (?, ?, ?, ?, ?, 1, ?)
+        """, (session_id, user_id, title, now, now, json.dumps({})))
+        
+        cursor.execute("""
+            INSERT INTO messages (message_id, session_id, role, content, timestamp, sources, metadata)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (message_id, session_id, "user", content, now, json.dumps([]), json.dumps({})))
+        
+        conn.commit()
+        conn.close()
+        
+        session = {
+            'session_id': session_id,
+            'user_id': user_id,
+            'title': title,
+            'created_at': now,
+            'message_count': 1
+        }
+        message = {
+            'message_id': message_id,
+            'session_id': session_id,
+            'role': "user",
+            'content': content,
+            'sources': [],
+            'metadata': {},
+            'timestamp': now
+        }
+        return session, message
+    
     def update_session_title(self, session_id: str, title: str) -> bool:
         """Update session title"""
         try:
@@ -237,6 +288,24 @@ class ChatDatabase:
             'metadata': json.loads(row['metadata']) if row['metadata'] else {}
         }
     
+    def get_session_version(self, session_id: str) -> Optional[tuple[str, str, int]]:
+        """
+        Get (user_id, updated_at, message_count) for a session.
+        Every write to a session or its messages bumps updated_at, so this
+        row identifies the current state of the session's history.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT user_id, updated_at, message_count FROM sessions WHERE session_id = ?
+        """, (session_id,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        return tuple(row) if row else None
+    
     def get_user_sessions(
         self,
         user_id: str,
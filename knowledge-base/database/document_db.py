@@ -1,17 +1,46 @@
 # database/document_db.py
 import sqlite3
 import json
+import queue
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 class DocumentDatabase:
     def __init__(self, db_path: str = "database/documents.db"):
         self.db_path = db_path
+        # Idle connections, reused across calls: opening one (and the WAL
+        # checkpoint when the last one closes) costs far more than a lookup
+        self._pool: "queue.SimpleQueue[sqlite3.Connection]" = queue.SimpleQueue()
         self._init_db()
     
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Take an idle connection from the pool, or open a new one. Each
+        connection is used by one thread at a time and handed back with
+        _release, so it may move between worker threads.
+        """
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # In WAL mode NORMAL sync skips the fsync on every commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, discarding uncommitted work and row_factory"""
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+        self._pool.put(conn)
+    
     def _init_db(self):
         """Initialize document tracking database tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
+        # WAL persists in the database file: readers no longer block on uploads
+        conn.execute("PRAGMA journal_mode=WAL")
         cursor = conn.cursor()
         
         # Documents table - tracks all uploaded files
@@ -27,7 +56,8 @@ class DocumentDatabase:
                 page_count INTEGER,
                 weaviate_doc_id TEXT,
                 metadata TEXT,
-                current_version INTEGER DEFAULT 1
+                current_version INTEGER DEFAULT 1,
+                status TEXT DEFAULT 'complete'
             )
         """)
         
@@ -54,7 +84,9 @@ class DocumentDatabase:
         cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_file_name ON documents(file_name)")
         cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_content_hash ON documents(content_hash)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploaded_by ON documents(uploaded_by)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_upload_date ON documents(upload_date)")
+        # (upload_date, doc_id) backs keyset pagination in list_documents
+        cursor.execute("DROP INDEX IF EXISTS idx_upload_date")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_upload_date_doc_id ON documents(upload_date, doc_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_version_doc_id ON document_versions(doc_id)")
         
         # Add current_version column if it doesn't exist (migration)
@@ -63,8 +95,15 @@ class DocumentDatabase:
         except sqlite3.OperationalError:
             pass  # Column already exists
         
+        # Add status column if it doesn't exist (migration): pending until the
+        # background Weaviate ingest of an upload finishes, then complete/failed
+        try:
+            cursor.execute("ALTER TABLE documents ADD COLUMN status TEXT DEFAULT 'complete'")
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+        
         conn.commit()
-        conn.close()
+        self._release(conn)
     
     def check_duplicate_by_filename(self, filename: str) -> Optional[Dict]:
         """
@@ -76,7 +115,7 @@ class DocumentDatabase:
         Returns:
             Document info dict if exists, None otherwise
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -88,7 +127,7 @@ class DocumentDatabase:
         """, (filename,))
         
         row = cursor.fetchone()
-        conn.close()
+        self._release(conn)
         
         if row:
             return {
@@ -119,7 +158,7 @@ class DocumentDatabase:
         if not content_hash or content_hash.startswith("temp-"):
             return None
             
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -127,11 +166,11 @@ class DocumentDatabase:
             SELECT doc_id, file_name, upload_date, file_size_bytes, 
                    chunks, uploaded_by, content_hash
             FROM documents 
-            WHERE content_hash = ?
+            WHERE content_hash = ? AND status IS NOT 'failed'
         """, (content_hash,))
         
         row = cursor.fetchone()
-        conn.close()
+        self._release(conn)
         
         if row:
             return {
@@ -161,8 +200,45 @@ class DocumentDatabase:
             - existing_doc: The existing document info (prioritizes filename match)
             - message: Human-readable description of the duplicate
         """
-        existing_by_filename = self.check_duplicate_by_filename(filename)
-        existing_by_hash = self.check_duplicate_by_hash(content_hash) if content_hash else None
+        # Skip hash matching for temporary hashes (same rule as check_duplicate_by_hash)
+        if content_hash and content_hash.startswith("temp-"):
+            content_hash = None
+        
+        # Both lookups in one query on one connection; SQLite serves the OR
+        # from the file_name and content_hash unique indexes. Records whose
+        # Weaviate ingest failed are not in the knowledge base, so they don't count.
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT doc_id, file_name, upload_date, file_size_bytes, 
+                   chunks, uploaded_by, content_hash, weaviate_doc_id, current_version
+            FROM documents 
+            WHERE (file_name = ? OR content_hash = ?) AND status IS NOT 'failed'
+        """, (filename, content_hash))
+        
+        rows = cursor.fetchall()
+        self._release(conn)
+        
+        existing_by_filename = None
+        existing_by_hash = None
+        for row in rows:
+            doc = {
+                "doc_id": row["doc_id"],
+                "file_name": row["file_name"],
+                "upload_date": row["upload_date"],
+                "file_size_bytes": row["file_size_bytes"],
+                "chunks": row["chunks"],
+                "uploaded_by": row["uploaded_by"],
+                "content_hash": row["content_hash"],
+                "weaviate_doc_id": row["weaviate_doc_id"],
+                "current_version": row["current_version"] or 1
+            }
+            if row["file_name"] == filename:
+                existing_by_filename = doc
+            if content_hash and row["content_hash"] == content_hash:
+                existing_by_hash = doc
         
         # Determine if duplicate exists and what type
         is_duplicate = bool(existing_by_filename or existing_by_hash)
@@ -200,25 +276,74 @@ class DocumentDatabase:
         Args:
             doc_data: Dictionary containing document information
             Required fields: doc_id, file_name, file_size_bytes, chunks, content_hash
-            Optional fields: uploaded_by, page_count, weaviate_doc_id, metadata
+            Optional fields: uploaded_by, page_count, weaviate_doc_id, metadata,
+                             status (default "complete")
             version: Version number for the document (default 1 for new documents)
             
         Returns:
             doc_id of inserted document
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
-        # Use Philippine time (UTC+8)
-        ph_tz = timezone(timedelta(hours=8))
-        upload_date = datetime.now(ph_tz).isoformat()
+        cursor.execute("""
+            INSERT INTO documents 
+            (doc_id, file_name, upload_date, file_size_bytes, chunks, 
+             uploaded_by, content_hash, page_count, weaviate_doc_id, metadata, current_version, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, self._document_row(doc_data, version))
+        
+        conn.commit()
+        self._release(conn)
+        
+        return doc_data.get("doc_id")
+    
+    def upsert_document(self, doc_data: Dict, version: int = 1) -> str:
+        """
+        Insert a document record, replacing the existing record with the same
+        file_name in the same statement (used when a document is re-uploaded).
+        
+        Args:
+            doc_data: Same fields as insert_document
+            version: Version number for the new record
+            
+        Returns:
+            doc_id of the stored document
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
         
         cursor.execute("""
             INSERT INTO documents 
             (doc_id, file_name, upload_date, file_size_bytes, chunks, 
-             uploaded_by, content_hash, page_count, weaviate_doc_id, metadata, current_version)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+             uploaded_by, content_hash, page_count, weaviate_doc_id, metadata, current_version, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(file_name) DO UPDATE SET
+                doc_id = excluded.doc_id,
+                upload_date = excluded.upload_date,
+                file_size_bytes = excluded.file_size_bytes,
+                chunks = excluded.chunks,
+                uploaded_by = excluded.uploaded_by,
+                content_hash = excluded.content_hash,
+                page_count = excluded.page_count,
+                weaviate_doc_id = excluded.weaviate_doc_id,
+                metadata = excluded.metadata,
+                current_version = excluded.current_version,
+                status = excluded.status
+        """, self._document_row(doc_data, version))
+        
+        conn.commit()
+        self._release(conn)
+        
+        return doc_data.get("doc_id")
+    
+    def _document_row(self, doc_data: Dict, version: int) -> tuple:
+        """Column values for a documents INSERT, in table order"""
+        # Use Philippine time (UTC+8)
+        ph_tz = timezone(timedelta(hours=8))
+        upload_date = datetime.now(ph_tz).isoformat()
+        
+        return (
             doc_data.get("doc_id"),
             doc_data.get("file_name"),
             upload_date,
@@ -229,13 +354,9 @@ class DocumentDatabase:
             doc_data.get("page_count"),
             doc_data.get("weaviate_doc_id"),
             json.dumps(doc_data.get("metadata", {})),
-            version
-        ))
-        
-        conn.commit()
-        conn.close()
-        
-        return doc_data.get("doc_id")
+            version,
+            doc_data.get("status", "complete")
+        )
     
     def update_document(self, doc_id: str, updates: Dict) -> bool:
         """
@@ -248,7 +369,7 @@ class DocumentDatabase:
         Returns:
             True if updated successfully
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Build dynamic UPDATE query
@@ -257,7 +378,7 @@ class DocumentDatabase:
         
         allowed_fields = [
             "file_name", "file_size_bytes", "chunks", "uploaded_by",
-            "content_hash", "page_count", "weaviate_doc_id"
+            "content_hash", "page_count", "weaviate_doc_id", "status"
         ]
         
         for field in allowed_fields:
@@ -270,7 +391,7 @@ class DocumentDatabase:
             values.append(json.dumps(updates["metadata"]))
         
         if not set_clauses:
-            conn.close()
+            self._release(conn)
             return False
         
         values.append(doc_id)
@@ -279,7 +400,7 @@ class DocumentDatabase:
         cursor.execute(query, values)
         conn.commit()
         affected = cursor.rowcount
-        conn.close()
+        self._release(conn)
         
         return affected > 0
     
@@ -293,16 +414,42 @@ class DocumentDatabase:
         Returns:
             True if deleted successfully
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
         conn.commit()
         affected = cursor.rowcount
-        conn.close()
+        self._release(conn)
         
         return affected > 0
     
+    def delete_failed_documents(self, filename: str, content_hash: Optional[str] = None) -> int:
+        """
+        Delete records whose Weaviate ingest failed and that share this filename
+        or content hash, so a re-upload doesn't collide with them on the unique
+        file_name/content_hash indexes.
+        
+        Args:
+            filename: Name of the file being uploaded
+            content_hash: Content hash of the file being uploaded
+            
+        Returns:
+            Number of records deleted
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            DELETE FROM documents
+            WHERE (file_name = ? OR content_hash = ?) AND status = 'failed'
+        """, (filename, content_hash))
+        conn.commit()
+        affected = cursor.rowcount
+        self._release(conn)
+        
+        return affected
+    
     def get_document(self, doc_id: str) -> Optional[Dict]:
         """
         Get a document by ID.
@@ -313,20 +460,20 @@ class DocumentDatabase:
         Returns:
             Document info dict if found, None otherwise
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
         cursor.execute("""
             SELECT doc_id, file_name, upload_date, file_size_bytes, 
                    chunks, uploaded_by, content_hash, page_count,
-                   weaviate_doc_id, metadata
+                   weaviate_doc_id, metadata, status
             FROM documents 
             WHERE doc_id = ?
         """, (doc_id,))
         
         row = cursor.fetchone()
-        conn.close()
+        self._release(conn)
         
         if row:
             return {
@@ -339,7 +486,8 @@ class DocumentDatabase:
                 "content_hash": row["content_hash"],
                 "page_count": row["page_count"],
                 "weaviate_doc_id": row["weaviate_doc_id"],
-                "metadata": json.loads(row["metadata"]) if row["metadata"] else {}
+                "metadata": json.loads(row["metadata"]) if row["metadata"] else {},
+                "status": row["status"]
             }
         return None
     
@@ -353,7 +501,7 @@ class DocumentDatabase:
         Returns:
             Document info dict if found, None otherwise
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -366,7 +514,7 @@ class DocumentDatabase:
         """, (file_name,))
         
         row = cursor.fetchone()
-        conn.close()
+        self._release(conn)
         
         if row:
             return {
@@ -390,7 +538,8 @@ class DocumentDatabase:
         offset: int = 0,
         uploaded_by: Optional[str] = None,
         order_by: str = "upload_date",
-        order_dir: str = "DESC"
+        order_dir: str = "DESC",
+        after: Optional[Tuple[str, str]] = None
     ) -> List[Dict]:
         """
         List all documents with pagination and filtering.
@@ -401,25 +550,35 @@ class DocumentDatabase:
             uploaded_by: Filter by user (optional)
             order_by: Field to sort by (default: upload_date)
             order_dir: Sort direction (ASC or DESC)
+            after: (upload_date, doc_id) of the last row of the previous page.
+                   Seeks past it on the upload_date index instead of using
+                   OFFSET; only applies when ordering by upload_date.
             
         Returns:
             List of document info dicts
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
         # Build query with optional filter
+        # Human-readable size is formatted in the same pass as the row read
         query = """
             SELECT doc_id, file_name, upload_date, file_size_bytes, 
+                   CASE
+                       WHEN file_size_bytes < 1024 THEN file_size_bytes || ' B'
+                       WHEN file_size_bytes < 1048576 THEN printf('%.2f KB', file_size_bytes / 1024.0)
+                       ELSE printf('%.2f MB', file_size_bytes / 1048576.0)
+                   END AS file_size_formatted,
                    chunks, uploaded_by, content_hash, page_count, current_version,
-                   weaviate_doc_id
+                   weaviate_doc_id, status
             FROM documents
         """
+        conditions = []
         params = []
         
         if uploaded_by:
-            query += " WHERE uploaded_by = ?"
+            conditions.append("uploaded_by = ?")
             params.append(uploaded_by)
         
         # Add ordering
@@ -427,15 +586,29 @@ class DocumentDatabase:
         if order_by not in allowed_order_fields:
             order_by = "upload_date"
         
-        if order_dir.upper() not in ["ASC", "DESC"]:
+        order_dir = order_dir.upper()
+        if order_dir not in ["ASC", "DESC"]:
             order_dir = "DESC"
         
-        query += f" ORDER BY {order_by} {order_dir} LIMIT ? OFFSET ?"
+        if order_by == "upload_date":
+            # doc_id breaks upload_date ties so the keyset is unique
+            if after:
+                conditions.append(f"(upload_date, doc_id) {'<' if order_dir == 'DESC' else '>'} (?, ?)")
+                params.extend(after)
+                offset = 0
+            order_clause = f"upload_date {order_dir}, doc_id {order_dir}"
+        else:
+            order_clause = f"{order_by} {order_dir}"
+        
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        
+        query += f" ORDER BY {order_clause} LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         
         cursor.execute(query, params)
         rows = cursor.fetchall()
-        conn.close()
+        self._release(conn)
         
         return [
             {
@@ -443,11 +616,13 @@ class DocumentDatabase:
                 "file_name": row["file_name"],
                 "upload_date": row["upload_date"],
                 "file_size_bytes": row["file_size_bytes"],
+                "file_size_formatted": row["file_size_formatted"],
                 "chunks": row["chunks"],
                 "uploaded_by": row["uploaded_by"],
                 "content_hash": row["content_hash"],
                 "page_count": row["page_count"],
                 "current_version": row["current_version"],
+                "status": row["status"],
                 "weaviate_doc_id": row["weaviate_doc_id"]
             }
             for row in rows
@@ -463,7 +638,7 @@ class DocumentDatabase:
         Returns:
             Total number of documents
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         if uploaded_by:
@@ -472,7 +647,7 @@ class DocumentDatabase:
             cursor.execute("SELECT COUNT(*) FROM documents")
         
         count = cursor.fetchone()[0]
-        conn.close()
+        self._release(conn)
         
         return count
 
@@ -491,9 +666,9 @@ class DocumentDatabase:
         Returns:
             version_id if successful, None otherwise
         """
-        import uuid
+        from utils.id_utils import uuid7
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -506,14 +681,14 @@ class DocumentDatabase:
         
         row = cursor.fetchone()
         if not row:
-            conn.close()
+            self._release(conn)
             return None
         
         # Use Philippine time (UTC+8)
         ph_tz = timezone(timedelta(hours=8))
         archived_date = datetime.now(ph_tz).isoformat()
         
-        version_id = str(uuid.uuid4())
+        version_id = str(uuid7())
         current_version = row["current_version"] or 1
         
         # Insert into version history
@@ -539,7 +714,7 @@ class DocumentDatabase:
         ))
         
         conn.commit()
-        conn.close()
+        self._release(conn)
         
         return version_id
     
@@ -553,7 +728,7 @@ class DocumentDatabase:
         Returns:
             Next version number
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Get max version from both current doc and version history
@@ -570,7 +745,7 @@ class DocumentDatabase:
         current = cursor.fetchone()
         current_version = current[0] if current else 0
         
-        conn.close()
+        self._release(conn)
         
         return max(max_archived, current_version) + 1
     
@@ -584,7 +759,7 @@ class DocumentDatabase:
         Returns:
             List of version records, newest first
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -599,7 +774,7 @@ class DocumentDatabase:
         """, (file_name,))
         
         rows = cursor.fetchall()
-        conn.close()
+        self._release(conn)
         
         return [
             {
@@ -635,13 +810,13 @@ class DocumentDatabase:
         
         # Get version number for current
         if current:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             cursor.execute("SELECT current_version FROM documents WHERE doc_id = ?", (current['doc_id'],))
             version_row = cursor.fetchone()
             current['version_number'] = version_row[0] if version_row else 1
             current['is_current'] = True
-            conn.close()
+            self._release(conn)
         
         # Get archived versions
         versions = self.get_document_versions(file_name)
@@ -654,4 +829,16 @@ class DocumentDatabase:
             "current": current,
             "versions": versions,
             "total_versions": total_versions
-        }
\ No newline at end of file
+        }
+
+
+# Singleton instance
+_document_db: Optional[DocumentDatabase] = None
+
+
+def get_document_db() -> DocumentDatabase:
+    """Get singleton document database instance (schema set up once per worker)."""
+    global _document_db
+    if _document_db is None:
+        _document_db = DocumentDatabase()
+    return _document_db
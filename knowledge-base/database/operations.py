@@ -5,8 +5,21 @@ from database.weaviate_client import get_weaviate_client, ensure_collections_exi
 from config import Config
 
 
+class ChunkInsertError(Exception):
+    """Raised when some chunks of a document could not be stored in Weaviate."""
+    def __init__(self, failed_count: int, total_count: int, message: str):
+        self.failed_count = failed_count
+        self.total_count = total_count
+        super().__init__(f"{failed_count} of {total_count} chunks could not be inserted: {message}")
+
+
 def insert_document(file_metadata: dict, chunks: list, doc_id: str = None):
-    """Insert a parent Document and all its KnowledgeBase chunks."""
+    """
+    Insert a parent Document and all its KnowledgeBase chunks.
+    
+    Raises ChunkInsertError if chunks still fail after one retry; the partially
+    inserted Document is deleted first, so nothing of it stays searchable.
+    """
     
     client = get_weaviate_client()
     
@@ -19,9 +32,36 @@ def insert_document(file_metadata: dict, chunks: list, doc_id: str = None):
     # Insert parent Document
     client.collections.get("Document").data.insert(file_metadata, uuid=doc_id)
 
-    # Insert child chunks
+    # Insert child chunks, retrying once any objects Weaviate rejected
+    failed = append_chunks(doc_id, chunks)
+    if failed:
+        print(f"⚠️ {len(failed)} chunks failed to insert ({failed[0].message}), retrying them")
+        failed = retry_failed_chunks(failed)
+        if failed:
+            print(f"❌ {len(failed)} chunks could not be inserted: {failed[0].message}")
+            try:
+                delete_document_and_chunks(doc_id)
+            except Exception as e:
+                print(f"⚠️ Could not remove partially inserted Document {doc_id}: {e}")
+            raise ChunkInsertError(len(failed), len(chunks), failed[0].message)
+
+    print(f"✅ Inserted Document {file_metadata['file_name']} with {len(chunks)} chunks")
+    return doc_id
+
+
+def append_chunks(doc_id: str, chunks: list) -> list:
+    """
+    Batch-insert KnowledgeBase chunks that reference the Document doc_id.
+    The client sends them in Config.BATCH_SIZE requests, up to
+    Config.BATCH_CONCURRENT_REQUESTS in flight, while the loop runs.
+    Returns the batch's failed objects (empty when every chunk was stored).
+    """
+    client = get_weaviate_client()
     chunks_collection = client.collections.get("KnowledgeBase")
-    with chunks_collection.batch.fixed_size(batch_size=Config.BATCH_SIZE) as batch:
+    with chunks_collection.batch.fixed_size(
+        batch_size=Config.BATCH_SIZE,
+        concurrent_requests=Config.BATCH_CONCURRENT_REQUESTS
+    ) as batch:
         for c in chunks:
             meta = c.get("metadata", {})
             chunk_obj = {
@@ -42,8 +82,25 @@ def insert_document(file_metadata: dict, chunks: list, doc_id: str = None):
                 references={"ofDocument": doc_id}
             )
 
-    print(f"✅ Inserted Document {file_metadata['file_name']} with {len(chunks)} chunks")
-    return doc_id
+    return chunks_collection.batch.failed_objects
+
+
+def retry_failed_chunks(failed: list) -> list:
+    """Re-send only the objects a previous batch reported as failed."""
+    client = get_weaviate_client()
+    chunks_collection = client.collections.get("KnowledgeBase")
+    with chunks_collection.batch.fixed_size(
+        batch_size=Config.BATCH_SIZE,
+        concurrent_requests=Config.BATCH_CONCURRENT_REQUESTS
+    ) as batch:
+        for error in failed:
+            batch.add_object(
+                properties=error.object_.properties,
+                references=error.object_.references,
+                uuid=error.object_.uuid
+            )
+
+    return chunks_collection.batch.failed_objects
 
 
 def delete_document_and_chunks(doc_id: str):
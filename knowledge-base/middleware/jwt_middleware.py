@@ -3,10 +3,65 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from config import Config
-from typing import Optional
+from typing import Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import threading
+import time
 
 security = HTTPBearer()
 
+
+class VerifiedTokenCache:
+    """
+    Bounded in-memory cache of verified JWT payloads.
+    Lets repeat requests with the same bearer token skip signature verification.
+    Entries expire after the TTL or at the token's own 'exp', whichever is first.
+    """
+    
+    def __init__(self, maxsize: int = 10000, ttl_seconds: int = 30):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def key_for(token: str) -> bytes:
+        """Hash the raw token so cached keys never hold the credential itself"""
+        return hashlib.sha256(token.encode()).digest()[:16]
+    
+    def get(self, key: bytes) -> Optional[dict]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if time.time() >= expires_at:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return payload
+    
+    def put(self, key: bytes, payload: dict):
+        expires_at = time.time() + self.ttl_seconds
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        
+        with self.lock:
+            self.entries[key] = (payload, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Global verified-token cache instance
+verified_token_cache = VerifiedTokenCache()
+
 def decode_jwt(token: str) -> dict:
     """
     Decode JWT token without raising exceptions.
@@ -93,9 +148,18 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         dict: Decoded token payload with user information
     """
     token = credentials.credentials
+    
+    # Recently verified tokens skip decoding and signature verification
+    cache_key = VerifiedTokenCache.key_for(token)
+    payload = verified_token_cache.get(cache_key)
+    if payload is not None:
+        return dict(payload)
+    
     print(f"[JWT DEBUG] Received token: {token[:50]}..." if len(token) > 50 else f"[JWT DEBUG] Received token: {token}")
     print(f"[JWT DEBUG] Using secret key: {Config.JWT_SECRET_KEY[:10]}..." if Config.JWT_SECRET_KEY else "[JWT DEBUG] NO SECRET KEY!")
-    return verify_jwt_token(token)
+    payload = verify_jwt_token(token)
+    verified_token_cache.put(cache_key, payload)
+    return dict(payload)
 
 async def get_user_id(current_user: dict = Depends(get_current_user)) -> str:
     """
@@ -4,6 +4,8 @@ Security middleware for rate limiting and request validation.
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
 from typing import Optional, Dict
+import os
+import re
 import time
 from collections import defaultdict
 import threading
@@ -167,6 +169,25 @@ async def security_headers_middleware(request: Request, call_next):
     return response
 
 
+async def upload_size_limit_middleware(request: Request, call_next):
+    """
+    Reject file uploads whose declared Content-Length is over MAX_FILE_SIZE_MB
+    before the body is read. Otherwise the multipart parser spools the whole
+    body to disk before the route can check the file size.
+    """
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        content_length = request.headers.get("content-length", "")
+        # Allowance for multipart boundaries, part headers and small form fields
+        max_body_bytes = MAX_FILE_SIZE_MB * 1024 * 1024 + 64 * 1024
+        if content_length.isdigit() and int(content_length) > max_body_bytes:
+            return JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": f"File size exceeds maximum allowed size of {MAX_FILE_SIZE_MB}MB"}
+            )
+    
+    return await call_next(request)
+
+
 def validate_string_length(value: str, max_length: int, field_name: str) -> str:
     """
     Validate string length to prevent abuse.
@@ -190,6 +211,10 @@ def validate_string_length(value: str, max_length: int, field_name: str) -> str:
     return value
 
 
+# Anything other than word characters, whitespace, '-' and '.' (includes NUL)
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w\s\-\.]')
+
+
 def sanitize_filename(filename: str) -> str:
     """
     Sanitize filename to prevent directory traversal attacks.
@@ -200,14 +225,11 @@ def sanitize_filename(filename: str) -> str:
     Returns:
         Sanitized filename
     """
-    import re
-    import os
-    
     # Remove path components
     filename = os.path.basename(filename)
     
     # Remove dangerous characters
-    filename = re.sub(r'[^\w\s\-\.]', '', filename)
+    filename = UNSAFE_FILENAME_CHARS.sub('', filename)
     
     # Limit length
     if len(filename) > 255:
@@ -3,7 +3,7 @@ import os
 import time
 import openai
 import asyncio
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 from database.chat_db import ChatDatabase
 from services.weaviate_search_service import WeaviateSearchService
@@ -29,6 +29,14 @@ quota_client = QuotaClientSync()
 QUOTA_ENABLED = os.getenv("QUOTA_ENABLED", "true").lower() == "true"
 
 
+class SessionNotFound(Exception):
+    """Raised when a chat session does not exist."""
+
+
+class SessionAccessDenied(Exception):
+    """Raised when a user acts on a chat session they don't own."""
+
+
 class ChatService:
     def __init__(self):
         self.chat_db = ChatDatabase()
@@ -61,6 +69,37 @@ class ChatService:
             Dict with assistant message details
         """
         options = options or {}
+        self._save_user_message(session_id, user_message, options, user_id)
+        
+        return self._reply_to_message(session_id, user_message, options, user_id)
+    
+    def stream_message(
+        self,
+        session_id: str,
+        user_message: str,
+        options: Optional[Dict] = None,
+        user_id: Optional[str] = None
+    ) -> Iterator[Dict]:
+        """
+        Streaming variant of process_message.
+        Ownership is checked and the user message saved before this returns,
+        so access errors raise up front. The returned iterator then yields
+        {'type': 'token', 'content': ...} events while the model generates and
+        a final {'type': 'done', 'message': <assistant message>} event.
+        """
+        options = options or {}
+        self._save_user_message(session_id, user_message, options, user_id)
+        
+        return self._stream_reply(session_id, user_message, options, user_id)
+    
+    def _save_user_message(
+        self,
+        session_id: str,
+        user_message: str,
+        options: Dict,
+        user_id: Optional[str] = None
+    ) -> Dict:
+        """Steps 0-1 of process_message: validate session ownership and save the user message"""
         max_sources = options.get('max_sources', 5)
         include_context = options.get('include_context', True)
         document_filter = options.get('document_filter', [])
@@ -78,9 +117,9 @@ class ChatService:
         if user_id:
             session = self.chat_db.get_session(session_id)
             if not session:
-                raise Exception("Session not found")
+                raise SessionNotFound("Session not found")
             if session.get('user_id') != user_id:
-                raise Exception("Access denied - you don't own this session")
+                raise SessionAccessDenied("Access denied - you don't own this session")
         
         # 1. Save user message
         user_msg = self.chat_db.save_message(
@@ -90,6 +129,121 @@ class ChatService:
         )
         print(f"[ChatService] Saved user message: {user_msg['message_id']}")
         
+        return user_msg
+    
+    def _reply_to_message(
+        self,
+        session_id: str,
+        user_message: str,
+        options: Dict,
+        user_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Steps 2-8 of process_message: retrieve, generate and save the reply
+        to a user message that has already been saved to the session.
+        """
+        context, processed_query, search_results, top_chunks = self._retrieve_knowledge(
+            session_id, user_message, options, user_id
+        )
+        
+        # 7. Generate response with OpenAI
+        print(f"\n[ChatService] 🤖 GENERATING AI RESPONSE")
+        print(f"[ChatService] Using {len(top_chunks)} knowledge chunks")
+        print(f"[ChatService] Context messages: {len(context)}")
+        
+        assistant_response = self._generate_response(
+            user_message=user_message,
+            context=context,
+            knowledge_chunks=top_chunks,
+            chunks_retrieved=len(search_results),
+            chunks_used=len(top_chunks),
+            session_id=session_id,
+            user_id=user_id
+        )
+        
+        return self._save_reply(session_id, assistant_response, processed_query, search_results, top_chunks)
+    
+    def _stream_reply(
+        self,
+        session_id: str,
+        user_message: str,
+        options: Dict,
+        user_id: Optional[str] = None
+    ) -> Iterator[Dict]:
+        """Steps 2-8 of stream_message, yielding tokens as OpenAI produces them"""
+        context, processed_query, search_results, top_chunks = self._retrieve_knowledge(
+            session_id, user_message, options, user_id
+        )
+        
+        # 7. Stream response from OpenAI
+        print(f"\n[ChatService] 🤖 STREAMING AI RESPONSE")
+        print(f"[ChatService] Using {len(top_chunks)} knowledge chunks")
+        print(f"[ChatService] Context messages: {len(context)}")
+        
+        start_time = time.time()
+        messages = self._build_messages(user_message, context, top_chunks)
+        parts = []
+        usage = None
+        try:
+            stream = self.openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1000,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                # The last chunk carries usage and no choices
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    token = chunk.choices[0].delta.content
+                    parts.append(token)
+                    yield {'type': 'token', 'content': token}
+        except Exception as e:
+            self._handle_generation_error(
+                e, start_time, len(search_results), len(top_chunks), session_id
+            )
+            raise
+        
+        duration_ms = (time.time() - start_time) * 1000
+        tokens_used = usage.total_tokens if usage else 0
+        self._record_generation(
+            input_tokens=usage.prompt_tokens if usage else 0,
+            output_tokens=usage.completion_tokens if usage else 0,
+            duration_ms=duration_ms,
+            chunks_retrieved=len(search_results),
+            chunks_used=len(top_chunks),
+            session_id=session_id,
+            user_id=user_id
+        )
+        
+        assistant_response = {
+            'content': ''.join(parts),
+            'tokens_used': tokens_used,
+            'duration_ms': duration_ms
+        }
+        assistant_msg = self._save_reply(session_id, assistant_response, processed_query, search_results, top_chunks)
+        yield {'type': 'done', 'message': assistant_msg}
+    
+    def _retrieve_knowledge(
+        self,
+        session_id: str,
+        user_message: str,
+        options: Dict,
+        user_id: Optional[str] = None
+    ) -> Tuple[List[Dict], Dict, List[Dict], List[Dict]]:
+        """
+        Steps 2-6 of process_message: gather conversation context, search and
+        rerank the knowledge base.
+        
+        Returns:
+            (context, processed_query, search_results, top_chunks)
+        """
+        include_context = options.get('include_context', True)
+        document_filter = options.get('document_filter', [])
+        
         # 2. Get conversation context
         context = []
         if include_context:
@@ -166,21 +320,17 @@ class ChatService:
             print(f"[ChatService] User ID: {user_id}")
             print(f"[ChatService] Estimated tokens: {estimated_tokens}")
         
-        # 7. Generate response with OpenAI
-        print(f"\n[ChatService] 🤖 GENERATING AI RESPONSE")
-        print(f"[ChatService] Using {len(top_chunks)} knowledge chunks")
-        print(f"[ChatService] Context messages: {len(context)}")
-        
-        assistant_response = self._generate_response(
-            user_message=user_message,
-            context=context,
-            knowledge_chunks=top_chunks,
-            chunks_retrieved=len(search_results),
-            chunks_used=len(top_chunks),
-            session_id=session_id,
-            user_id=user_id
-        )
-        
+        return context, processed_query, search_results, top_chunks
+    
+    def _save_reply(
+        self,
+        session_id: str,
+        assistant_response: Dict,
+        processed_query: Dict,
+        search_results: List[Dict],
+        top_chunks: List[Dict]
+    ) -> Dict:
+        """Steps 7-8 of process_message: save the assistant reply and update session metadata"""
         print(f"[ChatService] ✅ Generated response")
         print(f"[ChatService] Response Length: {len(assistant_response['content'])} characters")
         print(f"[ChatService] Tokens Used: {assistant_response['tokens_used']}")
@@ -270,7 +420,49 @@ class ChatService:
         Generate response using OpenAI with KB context
         """
         start_time = time.time()  # Track response time
+        messages = self._build_messages(user_message, context, knowledge_chunks)
         
+        try:
+            # Call OpenAI
+            response = self.openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1000
+            )
+            
+            duration_ms = (time.time() - start_time) * 1000  # Calculate duration
+            self._record_generation(
+                input_tokens=response.usage.prompt_tokens,
+                output_tokens=response.usage.completion_tokens,
+                duration_ms=duration_ms,
+                chunks_retrieved=chunks_retrieved,
+                chunks_used=chunks_used,
+                session_id=session_id,
+                user_id=user_id
+            )
+            
+            return {
+                'content': response.choices[0].message.content,
+                'tokens_used': response.usage.total_tokens,
+                'duration_ms': duration_ms
+            }
+        except Exception as e:
+            self._handle_generation_error(e, start_time, chunks_retrieved, chunks_used, session_id)
+            
+            # Fallback response for non-LLM errors
+            return {
+                'content': "I apologize, but I encountered an error while processing your question. Please try again.",
+                'tokens_used': 0
+            }
+    
+    def _build_messages(
+        self,
+        user_message: str,
+        context: List[Dict],
+        knowledge_chunks: List[Dict]
+    ) -> List[Dict]:
+        """Build the OpenAI chat messages: system prompt with KB context, history, then the user message"""
         # Build context from knowledge base chunks
         kb_context = self.context_manager.build_kb_context(knowledge_chunks)
         
@@ -326,98 +518,130 @@ Use all this information to provide comprehensive, well-cited answers that synth
             "content": user_message
         })
         
-        try:
-            # Call OpenAI
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            duration_ms = (time.time() - start_time) * 1000  # Calculate duration
-            tokens_used = response.usage.total_tokens
-            input_tokens = response.usage.prompt_tokens
-            output_tokens = response.usage.completion_tokens
-            cost = estimate_cost("gpt-4o", total_tokens=tokens_used)
-            
-            # Log the chat LLM call with full metrics
-            kb_logger.log_llm_call(
-                pipeline_type="chat",
-                stage="response_generation",
-                model="gpt-4o",
-                tokens=tokens_used,
-                cost=cost,
-                success=True,
-                duration_ms=duration_ms,
-                chunks_retrieved=chunks_retrieved,
-                chunks_used=chunks_used,
-                session_id=session_id
-            )
-            
-            # Report usage to Token Quota Service
-            if QUOTA_ENABLED and user_id:
-                try:
-                    quota_client.report(
-                        user_id=user_id,
-                        service="knowledge-base",
-                        model="gpt-4o",
-                        input_tokens=input_tokens,
-                        output_tokens=output_tokens,
-                        operation="chat",
-                        cost_usd=cost,  # Include calculated cost
-                        session_id=session_id,
-                        metadata={
-                            "chunks_retrieved": chunks_retrieved,
-                            "chunks_used": chunks_used,
-                            "duration_ms": duration_ms
-                        }
-                    )
-                    print(f"[ChatService] 📊 Reported {tokens_used} tokens (${cost:.6f}) to quota service")
-                except Exception as quota_error:
-                    print(f"[ChatService] ⚠️ Failed to report quota: {quota_error}")
-            
-            return {
-                'content': response.choices[0].message.content,
-                'tokens_used': tokens_used,
-                'duration_ms': duration_ms
-            }
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            print(f"[ChatService] Error generating response: {e}")
-            import traceback
-            traceback.print_exc()
-            
-            # Log the error with duration
-            kb_logger.log_llm_call(
-                pipeline_type="chat",
-                stage="response_generation",
-                model="gpt-4o",
-                tokens=0,
-                cost=0,
-                success=False,
-                error=str(e),
-                duration_ms=duration_ms,
-                chunks_retrieved=chunks_retrieved,
-                chunks_used=chunks_used,
-                session_id=session_id
-            )
-            
-            # Check if this is an LLM-specific error and raise it properly
-            if is_llm_error(e):
-                llm_error = handle_llm_error(e, context="KB Chat - Response Generation")
-                raise LLMServiceException(llm_error)
-            
-            # Fallback response for non-LLM errors
-            return {
-                'content': "I apologize, but I encountered an error while processing your question. Please try again.",
-                'tokens_used': 0
-            }
+        return messages
+    
+    def _record_generation(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        duration_ms: float,
+        chunks_retrieved: int = 0,
+        chunks_used: int = 0,
+        session_id: str = None,
+        user_id: str = None
+    ):
+        """Log a successful chat completion and report its usage to the quota service"""
+        tokens_used = input_tokens + output_tokens
+        cost = estimate_cost("gpt-4o", total_tokens=tokens_used)
+        
+        # Log the chat LLM call with full metrics
+        kb_logger.log_llm_call(
+            pipeline_type="chat",
+            stage="response_generation",
+            model="gpt-4o",
+            tokens=tokens_used,
+            cost=cost,
+            success=True,
+            duration_ms=duration_ms,
+            chunks_retrieved=chunks_retrieved,
+            chunks_used=chunks_used,
+            session_id=session_id
+        )
+        
+        # Report usage to Token Quota Service
+        if QUOTA_ENABLED and user_id:
+            try:
+                quota_client.report(
+                    user_id=user_id,
+                    service="knowledge-base",
+                    model="gpt-4o",
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    operation="chat",
+                    cost_usd=cost,  # Include calculated cost
+                    session_id=session_id,
+                    metadata={
+                        "chunks_retrieved": chunks_retrieved,
+                        "chunks_used": chunks_used,
+                        "duration_ms": duration_ms
+                    }
+                )
+                print(f"[ChatService] 📊 Reported {tokens_used} tokens (${cost:.6f}) to quota service")
+            except Exception as quota_error:
+                print(f"[ChatService] ⚠️ Failed to report quota: {quota_error}")
+    
+    def _handle_generation_error(
+        self,
+        error: Exception,
+        start_time: float,
+        chunks_retrieved: int = 0,
+        chunks_used: int = 0,
+        session_id: str = None
+    ):
+        """
+        Log a failed chat completion.
+        Raises LLMServiceException for LLM-specific errors; returns otherwise.
+        """
+        duration_ms = (time.time() - start_time) * 1000
+        print(f"[ChatService] Error generating response: {error}")
+        import traceback
+        traceback.print_exc()
+        
+        # Log the error with duration
+        kb_logger.log_llm_call(
+            pipeline_type="chat",
+            stage="response_generation",
+            model="gpt-4o",
+            tokens=0,
+            cost=0,
+            success=False,
+            error=str(error),
+            duration_ms=duration_ms,
+            chunks_retrieved=chunks_retrieved,
+            chunks_used=chunks_used,
+            session_id=session_id
+        )
+        
+        # Check if this is an LLM-specific error and raise it properly
+        if is_llm_error(error):
+            llm_error = handle_llm_error(error, context="KB Chat - Response Generation")
+            raise LLMServiceException(llm_error)
     
     def create_session(self, user_id: str, title: str = None) -> Dict:
         """Create a new chat session"""
         return self.chat_db.create_session(user_id, title)
     
+    def create_session_with_initial_message(
+        self,
+        user_id: str,
+        title: Optional[str],
+        message: str,
+        options: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Create a session and answer its first message.
+        The session and user message are inserted in one transaction, and the
+        ownership check is skipped since the session was just created for user_id.
+        
+        Returns:
+            Dict with the new session and the assistant's first response
+        """
+        session, user_msg = self.chat_db.create_session_with_message(user_id, title, message)
+        print(f"[ChatService] Created session {session['session_id']} with user message: {user_msg['message_id']}")
+        
+        first_response = self._reply_to_message(
+            session_id=session['session_id'],
+            user_message=message,
+            options=options or {},
+            user_id=user_id
+        )
+        
+        return {
+            'session_id': session['session_id'],
+            'created_at': session['created_at'],
+            'first_response': first_response
+        }
+    
     def get_session_history(self, session_id: str, limit: Optional[int] = None, user_id: Optional[str] = None) -> Dict:
         """Get session with message history, enforcing ownership"""
         session = self.chat_db.get_session(session_id)
@@ -435,6 +659,32 @@ Use all this information to provide comprehensive, well-cited answers that synth
             'messages': messages
         }
     
+    def get_history_version(self, session_id: str, user_id: Optional[str] = None) -> Optional[Tuple[str, int]]:
+        """Get (updated_at, message_count) of a session's history, enforcing ownership"""
+        version = self.chat_db.get_session_version(session_id)
+        if not version:
+            return None
+        
+        owner_id, updated_at, message_count = version
+        
+        # Validate ownership
+        if user_id and owner_id != user_id:
+            return None
+        
+        return updated_at, message_count
+    
+    def get_session_meta(self, session_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """Get session details without its messages, enforcing ownership"""
+        session = self.chat_db.get_session(session_id)
+        if not session:
+            return None
+        
+        # Validate ownership
+        if user_id and session.get('user_id') != user_id:
+            return None
+        
+        return session
+    
     def get_user_sessions(self, user_id: str, limit: int = 20, offset: int = 0) -> Dict:
         """Get all sessions for a user"""
         sessions, total = self.chat_db.get_user_sessions(user_id, limit, offset)
@@ -1,8 +1,12 @@
 """Service for AI-powered chunking of PDF content."""
+import hashlib
 import json
 import re
+import threading
 import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from services.openai_service import get_openai_client
 from models.schemas import JSON_SCHEMA, ENHANCED_CHUNKING_INSTRUCTIONS
@@ -16,6 +20,45 @@ kb_logger = KBLogger()
 token_tracker = TokenTracker()
 
 
+class ImageDescriptionCache:
+    """
+    In-process LRU of vision-model image descriptions keyed on the image,
+    prompt and model. Re-parsing a document (force_reparse, override uploads,
+    retries) sends the same images with the same surrounding context, so a
+    hit skips the GPT vision call.
+    """
+    
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(image_b64: str, prompt: str) -> tuple:
+        # Hash the base64 text as-is; decoding it first would only add a copy
+        image_hash = hashlib.sha256(image_b64.encode("ascii")).hexdigest()
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return (image_hash, prompt_hash, Config.OPENAI_MODEL, Config.TEMPERATURE)
+    
+    def get(self, key: tuple):
+        with self.lock:
+            description = self.entries.get(key)
+            if description is not None:
+                self.entries.move_to_end(key)
+            return description
+    
+    def put(self, key: tuple, description: str):
+        with self.lock:
+            self.entries[key] = description
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+# Global image description cache instance
+image_description_cache = ImageDescriptionCache()
+
+
 def process_text_only(simplified_view, filename: str = None, pipeline_id: str = None):
     """
     First pass: Process text content only for structural analysis
@@ -155,7 +198,6 @@ def process_images_only(images, simplified_view, filename: str = None, pipeline_
     if not images:
         return {"chunks": []}
     
-    image_chunks = []
     image_pat = re.compile(r"\[IMAGE\s+page=(\d+)\s+l=([\d.]+)\s+t=([\d.]+)\s+r=([\d.]+)\s+b=([\d.]+)\]")
     
     # Store context for each individual marker
@@ -221,8 +263,8 @@ def process_images_only(images, simplified_view, filename: str = None, pipeline_
     images_by_id = {image.get("id", f"img-{idx}"): image for idx, image in enumerate(images)}
     print(f"[DEBUG] Created image lookup with {len(images_by_id)} entries")
 
-    # Process each image with its matching context
-    for idx, image in enumerate(images):
+    def analyze_image(idx, image):
+        """Describe one image with the vision model; returns its chunk, or None on failure"""
         page = image.get("page", 1)
         image_id = image.get("id", f"img-{idx}")
         context_text = find_matching_context(image)
@@ -241,44 +283,51 @@ def process_images_only(images, simplified_view, filename: str = None, pipeline_
                         **Response format:** Provide a detailed description suitable for a knowledge base chunk."""
 
         try:
-            # Process single image with timing
-            img_start_time = time.time()
-            response = client.chat.completions.create(
-                model=Config.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": image_prompt},
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": f"Analyze this image from page {page}:"},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": f"data:image/png;base64,{image['image_b64']}"}
-                            }
-                        ]
-                    }
-                ],
-                temperature=Config.TEMPERATURE
-            )
-            img_duration_ms = (time.time() - img_start_time) * 1000
+            cache_key = image_description_cache.make_key(image['image_b64'], image_prompt)
+            description = image_description_cache.get(cache_key)
             
-            description = response.choices[0].message.content
-            
-            # Log the vision LLM call
-            tokens_used = response.usage.total_tokens if response.usage else 0
-            cost = estimate_cost(Config.OPENAI_MODEL, total_tokens=tokens_used)
-            kb_logger.log_llm_call(
-                pipeline_type="document_processing",
-                stage="image_analysis",
-                model=Config.OPENAI_MODEL,
-                tokens=tokens_used,
-                cost=cost,
-                success=True,
-                filename=filename,
-                chunks_created=1,
-                pipeline_id=pipeline_id,
-                duration_ms=img_duration_ms
-            )
+            if description is None:
+                # Process single image with timing
+                img_start_time = time.time()
+                response = client.chat.completions.create(
+                    model=Config.OPENAI_MODEL,
+                    messages=[
+                        {"role": "system", "content": image_prompt},
+                        {
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": f"Analyze this image from page {page}:"},
+                                {
+                                    "type": "image_url",
+                                    "image_url": {"url": f"data:image/png;base64,{image['image_b64']}"}
+                                }
+                            ]
+                        }
+                    ],
+                    temperature=Config.TEMPERATURE
+                )
+                img_duration_ms = (time.time() - img_start_time) * 1000
+                
+                description = response.choices[0].message.content
+                
+                # Log the vision LLM call
+                tokens_used = response.usage.total_tokens if response.usage else 0
+                cost = estimate_cost(Config.OPENAI_MODEL, total_tokens=tokens_used)
+                kb_logger.log_llm_call(
+                    pipeline_type="document_processing",
+                    stage="image_analysis",
+                    model=Config.OPENAI_MODEL,
+                    tokens=tokens_used,
+                    cost=cost,
+                    success=True,
+                    filename=filename,
+                    chunks_created=1,
+                    pipeline_id=pipeline_id,
+                    duration_ms=img_duration_ms
+                )
+                image_description_cache.put(cache_key, description)
+            else:
+                print(f"[DEBUG] Reusing cached description for image {idx+1} from page {page}")
             
             # Get precise bounding box from original image data
             original_image = images_by_id.get(image_id)
@@ -303,8 +352,8 @@ def process_images_only(images, simplified_view, filename: str = None, pipeline_
                 }
             }
             
-            image_chunks.append(image_chunk)
             print(f"[DEBUG] ✅ Processed image {idx+1} from page {page}")
+            return image_chunk
             
         except Exception as e:
             # Log error for image processing
@@ -320,7 +369,14 @@ def process_images_only(images, simplified_view, filename: str = None, pipeline_
                 pipeline_id=pipeline_id
             )
             print(f"[ERROR] Failed to process image {idx+1}: {e}")
-            continue
+            return None
+    
+    # Each image is an independent vision call that mostly waits on the network;
+    # run them concurrently (the OpenAI client is thread-safe). map() keeps
+    # the chunks in document order.
+    with ThreadPoolExecutor(max_workers=Config.IMAGE_ANALYSIS_CONCURRENCY) as executor:
+        results = executor.map(analyze_image, range(len(images)), images)
+        image_chunks = [chunk for chunk in results if chunk is not None]
     
     result = {"chunks": image_chunks}
     
@@ -1,9 +1,16 @@
 """PDF processing service - orchestrates the entire PDF processing pipeline."""
 import io
+import os
+import tempfile
+import threading
 import uuid
 import pdfplumber
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from core.pdf_extractor import assemble_elements, build_simplified_view_from_elements
+from typing import Optional
+from config import Config
+from core.pdf_extractor import extract_page_range, build_simplified_view_from_elements
+from core.page_extraction_worker import WorkerContext, extract_page_range_from_file
 from services.chunking_service import (
     process_text_only, 
     process_images_only, 
@@ -13,6 +20,67 @@ from services.chunking_service import (
 from services.anchoring_service import anchor_chunks_to_pdf
 from utils.file_utils import save_json
 
+# Page extraction (pdfplumber/PyMuPDF) is CPU-bound and holds the GIL, so page
+# ranges are fanned out to worker processes. "spawn" keeps the workers from
+# inheriting the parent's gRPC (Weaviate) and OpenAI client threads, and
+# WorkerContext keeps them from re-importing app.py (see page_extraction_worker).
+_page_extraction_pool: Optional[ProcessPoolExecutor] = None
+_page_extraction_pool_lock = threading.Lock()
+
+
+def get_page_extraction_pool() -> ProcessPoolExecutor:
+    """Get or create the page extraction process pool."""
+    global _page_extraction_pool
+    with _page_extraction_pool_lock:
+        if _page_extraction_pool is None:
+            _page_extraction_pool = ProcessPoolExecutor(
+                max_workers=Config.PDF_PARSE_WORKERS,
+                mp_context=WorkerContext()
+            )
+        return _page_extraction_pool
+
+
+def shutdown_page_extraction_pool():
+    """Stop the page extraction worker processes, if they were started."""
+    global _page_extraction_pool
+    with _page_extraction_pool_lock:
+        if _page_extraction_pool is not None:
+            _page_extraction_pool.shutdown(cancel_futures=True)
+            _page_extraction_pool = None
+
+
+def extract_structured_elements(file_bytes):
+    """
+    Extract the elements of every page, in page order. Documents longer than
+    one task's worth of pages are split into page ranges extracted in parallel.
+    """
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        page_count = len(pdf.pages)
+    
+    step = Config.PDF_PAGES_PER_TASK
+    if page_count <= step:
+        return extract_page_range(file_bytes, 0, page_count)
+    
+    # Workers read the document from a temp file once each, instead of getting
+    # a pickled copy of the bytes with every page-range task
+    fd, pdf_path = tempfile.mkstemp(prefix=f"kb-extract-{uuid.uuid4().hex}-", suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(file_bytes)
+        
+        pool = get_page_extraction_pool()
+        futures = [
+            pool.submit(extract_page_range_from_file, pdf_path, first, min(first + step, page_count))
+            for first in range(0, page_count, step)
+        ]
+        
+        structured = []
+        for future in futures:
+            structured.extend(future.result())
+        return structured
+    finally:
+        os.remove(pdf_path)
+
 
 def parse_and_chunk_pdf_file(file_bytes, source_filename):
     """
@@ -27,17 +95,7 @@ def parse_and_chunk_pdf_file(file_bytes, source_filename):
     """
     print(f"[DEBUG] Processing uploaded file: {source_filename}")
 
-    structured = []
-
-    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-        for i, page in enumerate(pdf.pages):
-            page_elems = assemble_elements(file_bytes, page, i)
-
-            for el in page_elems:
-                el["page"] = i + 1
-                el["page_width"] = page.width
-                el["page_height"] = page.height
-            structured.extend(page_elems)
+    structured = extract_structured_elements(file_bytes)
 
     simplified_view = build_simplified_view_from_elements(structured)
     print(f"[DEBUG] Extracted structure: {len(structured)} elements")
@@ -78,8 +136,13 @@ def parse_and_chunk_pdf_file(file_bytes, source_filename):
     pipeline_id = f"doc-{uuid.uuid4().hex[:12]}"
     print(f"[DEBUG] Pipeline ID: {pipeline_id}")
     
-    text_result = process_text_only(simplified_view, filename=source_filename, pipeline_id=pipeline_id)
-    image_result = process_images_only(images, simplified_view, filename=source_filename, pipeline_id=pipeline_id)
+    # The text and image passes are independent LLM calls over the same view;
+    # run them concurrently so the slower one hides the other
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        text_future = executor.submit(process_text_only, simplified_view, filename=source_filename, pipeline_id=pipeline_id)
+        image_future = executor.submit(process_images_only, images, simplified_view, filename=source_filename, pipeline_id=pipeline_id)
+        text_result = text_future.result()
+        image_result = image_future.result()
     
     # Merge chunks
     merged_result = merge_text_and_image_chunks(
@@ -0,0 +1,128 @@
+"""
+Keyset pagination of the document list (DocumentDatabase.list_documents and
+GET /kb/list-kb next_cursor).
+"""
+import sqlite3
+
+import pytest
+
+import database.document_db as document_db
+from database.document_db import DocumentDatabase
+
+
+# Two rows share each upload_date so doc_id has to break the ties
+UPLOAD_DATES = [
+    "2026-01-01T08:00:00+08:00",
+    "2026-01-01T08:00:00+08:00",
+    "2026-01-02T08:00:00+08:00",
+    "2026-01-03T08:00:00+08:00",
+    "2026-01-03T08:00:00+08:00",
+    "2026-01-04T08:00:00+08:00",
+    "2026-01-05T08:00:00+08:00",
+    "2026-01-05T08:00:00+08:00",
+    "2026-01-06T08:00:00+08:00",
+    "2026-01-07T08:00:00+08:00",
+]
+FILE_SIZES = [512, 2048, 5 * 1024 * 1024]
+
+
+@pytest.fixture
+def doc_db(tmp_path, monkeypatch):
+    """DocumentDatabase on a temp file, filled with len(UPLOAD_DATES) documents"""
+    db_path = str(tmp_path / "documents.db")
+    db = DocumentDatabase(db_path)
+
+    for i, upload_date in enumerate(UPLOAD_DATES):
+        db.insert_document({
+            "doc_id": f"doc-{i:02d}",
+            "file_name": f"file-{i:02d}.pdf",
+            "file_size_bytes": FILE_SIZES[i % len(FILE_SIZES)],
+            "chunks": i + 1,
+            "content_hash": f"hash-{i:02d}",
+        })
+
+    # insert_document stamps the current time; pin the dates
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "UPDATE documents SET upload_date = ? WHERE doc_id = ?",
+        [(upload_date, f"doc-{i:02d}") for i, upload_date in enumerate(UPLOAD_DATES)]
+    )
+    conn.commit()
+    conn.close()
+
+    # Routes go through get_document_db()
+    monkeypatch.setattr(document_db, "_document_db", db)
+    return db
+
+
+def expected_order(order_dir: str) -> list:
+    rows = sorted((upload_date, f"doc-{i:02d}") for i, upload_date in enumerate(UPLOAD_DATES))
+    if order_dir == "DESC":
+        rows.reverse()
+    return [doc_id for _, doc_id in rows]
+
+
+@pytest.mark.parametrize("order_dir", ["ASC", "DESC"])
+def test_list_documents_keyset_pages(doc_db, order_dir):
+    seen = []
+    after = None
+    while True:
+        page = doc_db.list_documents(limit=3, order_dir=order_dir, after=after)
+        seen.extend(doc["doc_id"] for doc in page)
+        if len(page) < 3:
+            break
+        after = (page[-1]["upload_date"], page[-1]["doc_id"])
+
+    assert seen == expected_order(order_dir)
+
+
+def test_list_documents_formats_file_size(doc_db):
+    documents = doc_db.list_documents(limit=3, order_dir="ASC")
+
+    assert [doc["file_size_formatted"] for doc in documents] == ["512 B", "2.00 KB", "5.00 MB"]
+
+
+@pytest.mark.parametrize("order_dir", ["ASC", "DESC"])
+def test_list_kb_next_cursor(client, doc_db, order_dir):
+    seen = []
+    params = {"limit": 3, "order_dir": order_dir}
+    while True:
+        response = client.get("/kb/list-kb", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        seen.extend(doc["doc_id"] for doc in body["documents"])
+        if not body["next_cursor"]:
+            break
+        params["cursor"] = body["next_cursor"]
+
+    assert seen == expected_order(order_dir)
+    assert len(set(seen)) == len(UPLOAD_DATES)
+
+
+@pytest.mark.parametrize("cursor", ["no-separator", "|doc-01", "2026-01-01T08:00:00+08:00|"])
+def test_list_kb_rejects_malformed_cursor(client, doc_db, cursor):
+    response = client.get("/kb/list-kb", params={"limit": 3, "cursor": cursor})
+
+    assert response.status_code == 400
+
+
+def test_list_kb_rejects_cursor_for_other_orderings(client, doc_db):
+    response = client.get("/kb/list-kb", params={
+        "limit": 3,
+        "order_by": "file_name",
+        "cursor": "2026-01-01T08:00:00+08:00|doc-01",
+    })
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("params, expected_offset", [
+    ({"limit": 3, "offset": 4}, 4),
+    ({"limit": 3, "offset": 4, "order_by": "file_name"}, 4),
+    ({"limit": 3, "offset": 4, "cursor": "2026-01-03T08:00:00+08:00|doc-04"}, 0),
+])
+def test_list_kb_reports_offset_used(client, doc_db, params, expected_offset):
+    response = client.get("/kb/list-kb", params=params)
+
+    assert response.status_code == 200
+    assert response.json()["offset"] == expected_offset
@@ -0,0 +1,32 @@
+"""
+UUIDv7 generation (utils.id_utils.uuid7).
+"""
+import time
+import uuid
+
+from utils.id_utils import uuid7
+
+
+def test_uuid7_version_and_variant():
+    value = uuid7()
+
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+
+
+def test_uuid7_embeds_current_millisecond_timestamp():
+    before_ms = time.time_ns() // 1_000_000
+    value = uuid7()
+    after_ms = time.time_ns() // 1_000_000
+
+    assert before_ms <= value.int >> 80 <= after_ms
+
+
+def test_uuid7_sorts_by_creation_time():
+    ids = []
+    for _ in range(5):
+        ids.append(str(uuid7()))
+        time.sleep(0.002)
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
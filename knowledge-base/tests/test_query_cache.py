@@ -0,0 +1,124 @@
+"""
+POST /kb/query result caching (QueryResultCache in front of query_weaviate).
+"""
+from types import SimpleNamespace
+
+import pytest
+
+
+CHUNKS = [
+    {"text": "Alice leads the project.", "section": "Team", "page": 1},
+    {"text": "Bob maintains the backend.", "section": "Team", "page": 2},
+    {"text": "Carol handles deployments.", "section": "Operations", "page": 3},
+]
+
+
+class FakeWeaviate:
+    """Records hybrid searches and returns CHUNKS as Weaviate objects"""
+
+    def __init__(self):
+        self.hybrid_calls = []
+        self.collections = SimpleNamespace(use=lambda name: SimpleNamespace(
+            query=SimpleNamespace(hybrid=self.hybrid)
+        ))
+
+    def hybrid(self, query, alpha, limit):
+        self.hybrid_calls.append((query, limit))
+        return SimpleNamespace(objects=[SimpleNamespace(properties=dict(c)) for c in CHUNKS])
+
+
+class FakeOpenAI:
+    """Records answer generations and returns a fixed answer"""
+
+    def __init__(self):
+        self.generations = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.generations += 1
+        message = SimpleNamespace(content="Alice, Bob and Carol.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def fake_rerank(query, retrieved_chunks, top_m=5):
+    # Score by position so the order is stable
+    scored = [(chunk, 1.0 - i / 10) for i, chunk in enumerate(retrieved_chunks)]
+    return scored[:top_m]
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    """Fake Weaviate/OpenAI behind the real query_weaviate, with an empty cache"""
+    import api.kb_routes as kb_routes
+    import services.weaviate_service as weaviate_service
+    
+    weaviate = FakeWeaviate()
+    openai = FakeOpenAI()
+    monkeypatch.setattr(weaviate_service, "get_weaviate_client", lambda: weaviate)
+    monkeypatch.setattr(weaviate_service, "get_openai_client", lambda: openai)
+    monkeypatch.setattr(weaviate_service, "rerank_with_openai", fake_rerank)
+    monkeypatch.setattr(kb_routes, "query_result_cache", kb_routes.QueryResultCache())
+    return weaviate, openai, kb_routes
+
+
+def test_query_returns_reranked_results_and_answer(client, backends):
+    response = client.post("/kb/query", json={"query": "Who is on the team?", "limit": 2})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["text"] for r in body["results"]] == [c["text"] for c in CHUNKS[:2]]
+    assert body["answer"] == "Alice, Bob and Carol."
+    assert body["metadata"]["result_count"] == 2
+
+
+def test_repeated_query_is_served_from_cache(client, backends):
+    weaviate, openai, _ = backends
+    payload = {"query": "Who is on the team?", "limit": 2}
+
+    first = client.post("/kb/query", json=payload)
+    second = client.post("/kb/query", json=payload)
+
+    assert first.status_code == second.status_code == 200
+    assert second.json()["results"] == first.json()["results"]
+    assert second.json()["answer"] == first.json()["answer"]
+    assert len(weaviate.hybrid_calls) == 1
+    assert openai.generations == 1
+
+
+def test_cache_key_includes_limit_and_generate_answer(client, backends):
+    weaviate, openai, _ = backends
+
+    client.post("/kb/query", json={"query": "Who is on the team?", "limit": 2})
+    client.post("/kb/query", json={"query": "Who is on the team?", "limit": 3})
+    response = client.post("/kb/query", json={"query": "Who is on the team?", "limit": 2, "generate_answer": False})
+
+    assert len(weaviate.hybrid_calls) == 3
+    assert openai.generations == 2
+    assert response.json()["answer"] is None
+
+
+def test_failed_generation_is_not_cached(client, backends, monkeypatch):
+    weaviate, openai, _ = backends
+    payload = {"query": "Who is on the team?"}
+
+    def fail(**kwargs):
+        raise RuntimeError("generation unavailable")
+
+    monkeypatch.setattr(openai.chat.completions, "create", fail)
+    assert client.post("/kb/query", json=payload).status_code == 500
+
+    monkeypatch.setattr(openai.chat.completions, "create", openai.create)
+    assert client.post("/kb/query", json=payload).status_code == 200
+    assert len(weaviate.hybrid_calls) == 2
+
+
+def test_cache_expires_after_ttl(client, backends, monkeypatch):
+    weaviate, _, kb_routes = backends
+    payload = {"query": "Who is on the team?", "generate_answer": False}
+
+    client.post("/kb/query", json=payload)
+    now = kb_routes.time.time()
+    monkeypatch.setattr(kb_routes.time, "time", lambda: now + kb_routes.query_result_cache.ttl_seconds)
+    client.post("/kb/query", json=payload)
+
+    assert len(weaviate.hybrid_calls) == 2